@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import bisect
+import datetime
+import os
+import re
+import unicodedata
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from calendar_api import Booking
+
+# a phone number is matched on its last digits, so "+33 6 12 34 56 78" finds "06 12 34 56 78"
+PHONE_SIGNIFICANT_DIGITS = 9
+# a lookup fetches the bookings changed since the previous sync when the index is older than this
+BOOKING_INDEX_REFRESH_S = float(os.getenv("BOOKING_INDEX_REFRESH_S", "30"))
+
+
+def normalize_phone(phone: str) -> str:
+    return re.sub(r"\D", "", phone)[-PHONE_SIGNIFICANT_DIGITS:]
+
+
+def name_tokens(name: str) -> set[str]:
+    """Case and accent insensitive words of a name, "Éloïse  Dupont" -> {"eloise", "dupont"}."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return set(re.findall(r"[a-z0-9]+", ascii_name.casefold()))
+
+
+class BookingIndex:
+    """
+    Upcoming bookings indexed by normalised phone number, name words and start time.
+
+    `synced_at` remembers the latest update already applied, so the owner can refresh the
+    index incrementally with the bookings changed since then.
+    """
+
+    def __init__(self, bookings: Iterable[Booking] = ()) -> None:
+        self._by_uid: dict[str, Booking] = {}
+        self._by_phone: dict[str, set[str]] = {}
+        self._by_name: dict[str, set[str]] = {}
+        self._by_start: list[tuple[datetime.datetime, str]] = []
+        self.synced_at: datetime.datetime | None = None
+        self.refreshed_at = 0.0
+        for booking in bookings:
+            self.put(booking)
+
+    def __len__(self) -> int:
+        return len(self._by_uid)
+
+    def get(self, uid: str) -> Booking | None:
+        return self._by_uid.get(uid)
+
+    def put(self, booking: Booking) -> None:
+        """Add a booking or replace the previous version of it."""
+        self.remove(booking.uid)
+        self._by_uid[booking.uid] = booking
+        if booking.attendee_phone and (phone := normalize_phone(booking.attendee_phone)):
+            self._by_phone.setdefault(phone, set()).add(booking.uid)
+        for token in name_tokens(booking.attendee_name):
+            self._by_name.setdefault(token, set()).add(booking.uid)
+        bisect.insort(self._by_start, (booking.start_time, booking.uid))
+
+    def remove(self, uid: str) -> None:
+        if (booking := self._by_uid.pop(uid, None)) is None:
+            return
+        if booking.attendee_phone:
+            self._discard(self._by_phone, normalize_phone(booking.attendee_phone), uid)
+        for token in name_tokens(booking.attendee_name):
+            self._discard(self._by_name, token, uid)
+        i = bisect.bisect_left(self._by_start, (booking.start_time, uid))
+        if i < len(self._by_start) and self._by_start[i] == (booking.start_time, uid):
+            del self._by_start[i]
+
+    def find(
+        self,
+        *,
+        phone: str | None = None,
+        name: str | None = None,
+        start_time: datetime.datetime | None = None,
+        end_time: datetime.datetime | None = None,
+    ) -> list[Booking]:
+        """
+        Bookings matching every given criterion, in chronological order. A name matches if all
+        of its words appear in the attendee name.
+        """
+        uids: set[str] | None = None
+        if phone is not None:
+            uids = set(self._by_phone.get(normalize_phone(phone), ()))
+        if name is not None:
+            for token in name_tokens(name):
+                matches = self._by_name.get(token, set())
+                uids = set(matches) if uids is None else uids & matches
+
+        lo = 0 if start_time is None else bisect.bisect_left(self._by_start, (start_time, ""))
+        hi = len(self._by_start) if end_time is None else bisect.bisect_left(self._by_start, (end_time, ""))
+        return [
+            self._by_uid[uid]
+            for _, uid in self._by_start[lo:hi]
+            if uids is None or uid in uids
+        ]
+
+    @staticmethod
+    def _discard(index: dict[str, set[str]], key: str, uid: str) -> None:
+        if (uids := index.get(key)) is not None:
+            uids.discard(uid)
+            if not uids:
+                del index[key]
+
+
+_shared_booking_indexes: dict[str, BookingIndex] = {}
+
+
+def shared_booking_index(account: str) -> BookingIndex:
+    """Return the process-wide index of the upcoming bookings of a calendar account."""
+    if (index := _shared_booking_indexes.get(account)) is None:
+        index = _shared_booking_indexes[account] = BookingIndex()
+    return index
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+import weakref
+from collections.abc import AsyncIterator
+from typing import Any
+
+import aiohttp
+
+from latency import LatencyHistogram
+
+CALCOM_CONN_LIMIT = 32
+CALCOM_CONN_LIMIT_PER_HOST = 16
+CALCOM_DNS_CACHE_TTL_S = 300
+CALCOM_KEEPALIVE_S = 60.0
+
+# total time budget of a single attempt, per endpoint
+CALCOM_TIMEOUTS_S = {
+    "me": 5.0,
+    "event-types": 5.0,
+    "create-event-type": 10.0,
+    "slots": 4.0,
+    "bookings": 15.0,
+    "list-bookings": 8.0,
+    "cancel-booking": 10.0,
+    "reschedule-booking": 15.0,
+}
+CALCOM_DEFAULT_TIMEOUT_S = 10.0
+# only idempotent reads are retried, a booking POST is never replayed
+CALCOM_READ_RETRIES = 2
+CALCOM_RETRY_BASE_DELAY_S = 0.2
+CALCOM_BREAKER_FAILURE_THRESHOLD = 5
+CALCOM_BREAKER_RESET_S = 30.0
+
+logger = logging.getLogger("cal.com")
+
+
+class CalComUnavailableError(Exception):
+    """cal.com timed out, could not be reached or answered with a server error."""
+
+
+class CircuitOpenError(CalComUnavailableError):
+    """Raised without any network call while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fast-fails every request for
+    `reset_timeout` seconds, then lets a single trial request through (half-open).
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = CALCOM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = CALCOM_BREAKER_RESET_S,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_in_flight or time.monotonic() - self._opened_at < self._reset_timeout:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("✅ cal.com circuit breaker closed")
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Let another trial through, the current one ended without telling whether cal.com is back."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning(f"⚠️  cal.com circuit breaker opened after {self._failures} failures")
+            self._opened_at = time.monotonic()
+
+
+class CalComHTTPClient:
+    """
+    Pooled HTTP client for the cal.com API.
+
+    Connections are kept alive and reused across requests (and calls), so a booking burst
+    doesn't pay a TLS handshake per request. Latency is recorded per endpoint.
+
+    Every attempt has a per-endpoint timeout, GET requests are retried with jittered backoff
+    and a circuit breaker fast-fails while cal.com keeps failing.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = CALCOM_CONN_LIMIT,
+        limit_per_host: int = CALCOM_CONN_LIMIT_PER_HOST,
+        dns_cache_ttl: int = CALCOM_DNS_CACHE_TTL_S,
+        keepalive_timeout: float = CALCOM_KEEPALIVE_S,
+    ) -> None:
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.breaker = CircuitBreaker()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=self._dns_cache_ttl,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, method: str, url: str, *, endpoint: str, **kwargs: Any
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Perform a request, `endpoint` names its timeout and the latency histogram it is recorded in.
+
+        Raises:
+            CalComUnavailableError: on timeout, connection error or 5xx (after the retries for
+                reads), or right away while the circuit breaker is open. 4xx responses are
+                handed to the caller.
+        """
+        timeout = aiohttp.ClientTimeout(
+            total=CALCOM_TIMEOUTS_S.get(endpoint, CALCOM_DEFAULT_TIMEOUT_S)
+        )
+        retries = CALCOM_READ_RETRIES if method == "GET" else 0
+
+        for attempt in range(retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"cal.com {endpoint}: circuit breaker is open")
+
+            started = time.perf_counter()
+            try:
+                resp = await self.session.request(method, url, timeout=timeout, **kwargs)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                self._observe(endpoint, started)
+                self.breaker.record_failure()
+                if attempt == retries:
+                    raise CalComUnavailableError(f"cal.com {endpoint}: {type(e).__name__}: {e}") from e
+                reason = type(e).__name__
+            except asyncio.CancelledError:
+                # e.g. the caller hung up, a half-open trial must not stay in flight forever
+                self.breaker.release_trial()
+                raise
+            except BaseException:
+                self._observe(endpoint, started)
+                self.breaker.record_failure()
+                raise
+            else:
+                if resp.status < 500 and resp.status != 429:
+                    break
+
+                resp.release()
+                self._observe(endpoint, started)
+                self.breaker.record_failure()
+                if attempt == retries:
+                    raise CalComUnavailableError(f"cal.com {endpoint}: HTTP {resp.status}")
+                reason = f"HTTP {resp.status}"
+
+            # full jitter, concurrent retries must not hit cal.com in lockstep
+            delay = random.uniform(0, CALCOM_RETRY_BASE_DELAY_S * 2**attempt)
+            logger.warning(f"⚠️  cal.com {endpoint}: {reason}, retrying in {delay * 1000:.0f}ms")
+            await asyncio.sleep(delay)
+
+        # cal.com answered, a 4xx is the caller's problem, not an outage
+        self.breaker.record_success()
+        try:
+            async with resp:
+                yield resp
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+            self.breaker.record_failure()
+            raise CalComUnavailableError(f"cal.com {endpoint}: {type(e).__name__}: {e}") from e
+        finally:
+            self._observe(endpoint, started)
+
+    def _observe(self, endpoint: str, started: float) -> None:
+        histogram = self.latency.get(endpoint)
+        if histogram is None:
+            histogram = self.latency[endpoint] = LatencyHistogram()
+        histogram.observe(time.perf_counter() - started)
+
+    def log_latency(self) -> None:
+        for endpoint, histogram in sorted(self.latency.items()):
+            logger.info(f"⏱️  cal.com {endpoint}: {histogram.summary()}")
+
+    async def aclose(self) -> None:
+        self.log_latency()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# aiohttp sessions are bound to an event loop, so "shared" means one client per loop
+_shared_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CalComHTTPClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_calcom_client() -> CalComHTTPClient:
+    """
+    Return the cal.com client shared by every calendar running on the current event loop.
+
+    The client outlives the jobs using it, its connections stay warm for the next call; it is
+    closed when the loop shuts down, i.e. when the worker process (or job thread) exits.
+    """
+    loop = asyncio.get_running_loop()
+    client = _shared_clients.get(loop)
+    if client is None:
+        client = _shared_clients[loop] = CalComHTTPClient()
+        loop.create_task(_close_on_loop_shutdown(client), name="calcom_client_close")
+    return client
+
+
+async def _close_on_loop_shutdown(client: CalComHTTPClient) -> None:
+    # asyncio.run() and the job runners cancel the tasks left when they shut their loop down
+    try:
+        await asyncio.Future()
+    finally:
+        await client.aclose()
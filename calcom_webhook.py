@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import hmac
+import json
+from typing import Any
+
+# topic of the LiveKit data messages telling the agents which days to drop from their caches
+CALCOM_INVALIDATE_TOPIC = "calcom-invalidate"
+
+# cal.com triggers that change the availability
+BOOKING_TRIGGERS = ("BOOKING_CREATED", "BOOKING_CANCELLED", "BOOKING_RESCHEDULED")
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str) -> bool:
+    """Check the X-Cal-Signature-256 header, the hex HMAC-SHA256 of the raw body."""
+    if not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def affected_days(payload: dict[str, Any]) -> list[datetime.date]:
+    """
+    UTC days whose availability a booking webhook changes, for a reschedule both the new
+    and the previous time.
+    """
+    days: set[datetime.date] = set()
+    for start_field, end_field in (
+        ("startTime", "endTime"),
+        ("rescheduleStartTime", "rescheduleEndTime"),
+    ):
+        if not (start := payload.get(start_field)):
+            continue
+        start_time = _parse_time(start)
+        end_time = _parse_time(payload[end_field]) if payload.get(end_field) else start_time
+        day = start_time.date()
+        while day <= end_time.date():
+            days.add(day)
+            day += datetime.timedelta(days=1)
+    return sorted(days)
+
+
+def encode_invalidation(event_type_id: int, days: list[datetime.date]) -> bytes:
+    return json.dumps(
+        {"event_type_id": event_type_id, "days": [day.isoformat() for day in days]}
+    ).encode()
+
+
+def decode_invalidation(data: bytes) -> tuple[int, list[datetime.date]]:
+    """
+    Raises:
+        ValueError: if the message is malformed
+    """
+    try:
+        message = json.loads(data)
+        return int(message["event_type_id"]), [
+            datetime.date.fromisoformat(day) for day in message["days"]
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed invalidation message: {e}") from e
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.astimezone(datetime.timezone.utc)
@@ -1,39 +1,198 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import bisect
 import datetime
 import hashlib
 import logging
+import math
 import random
-from dataclasses import dataclass
-from typing import Protocol
+import time
+import uuid
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field, replace
+from typing import Protocol, overload
 from urllib.parse import urlencode
 from zoneinfo import ZoneInfo
 
-import aiohttp
+from booking_index import BOOKING_INDEX_REFRESH_S, BookingIndex, shared_booking_index
+from calcom_http import CalComHTTPClient, CalComUnavailableError, shared_calcom_client
+from slot_cache import SlotCache, shared_slot_cache
 
-from livekit.agents.utils import http_context
 
+class CalendarError(Exception):
+    """Base class of the errors raised by calendar implementations."""
 
-class SlotUnavailableError(Exception):
+
+class SlotUnavailableError(CalendarError):
     def __init__(self, message: str) -> None:
         super().__init__(message)
 
 
-@dataclass
+class CalendarUnavailableError(CalendarError):
+    """The calendar backend can't be reached right now, it says nothing about availability."""
+
+
+class BookingNotFoundError(CalendarError):
+    """The booking doesn't exist (anymore), e.g. it was already cancelled."""
+
+
+@dataclass(frozen=True)
+class Booking:
+    uid: str
+    start_time: datetime.datetime
+    duration_min: int
+    attendee_name: str
+    attendee_email: str
+    attendee_phone: str | None = None
+    # the cal.com event type, to know whose availability the booking changes
+    event_type_id: int | None = None
+
+    @classmethod
+    def from_calcom_json(cls, data: dict) -> Booking:
+        """Parse a cal.com v2 booking."""
+        attendee = (data.get("attendees") or [{}])[0]
+        start_time = _parse_calcom_time(data["start"])
+        duration_min = data.get("duration") or int(
+            (_parse_calcom_time(data["end"]) - start_time).total_seconds() // 60
+        )
+        phone = attendee.get("phoneNumber") or (data.get("bookingFieldsResponses") or {}).get(
+            "attendeePhoneNumber"
+        )
+        return cls(
+            uid=data["uid"],
+            start_time=start_time,
+            duration_min=duration_min,
+            attendee_name=attendee.get("name", ""),
+            attendee_email=attendee.get("email", ""),
+            attendee_phone=phone,
+            event_type_id=data.get("eventTypeId"),
+        )
+
+
+def _parse_calcom_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+@dataclass(frozen=True, slots=True)
 class AvailableSlot:
     start_time: datetime.datetime
     duration_min: int
+    unique_hash: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def unique_hash(self) -> str:
-        # unique id based on the start_time & duration_min
+    def __post_init__(self) -> None:
+        # unique id based on the start_time & duration_min, computed once per slot
         raw = f"{self.start_time.isoformat()}|{self.duration_min}".encode()
         digest = hashlib.blake2s(raw, digest_size=5).digest()
-        return f"ST_{base64.b32encode(digest).decode().rstrip('=').lower()}"
+        object.__setattr__(
+            self, "unique_hash", f"ST_{base64.b32encode(digest).decode().rstrip('=').lower()}"
+        )
+
+
+class SlotBatch(Sequence[AvailableSlot]):
+    """
+    Compact, sorted run of slots sharing the same duration.
+
+    Start times are kept as UTC epoch seconds in an array, `AvailableSlot` objects are only
+    built when an item is first accessed. They are then kept, shared with the batches sliced
+    or split from this one, so listing the same cached day again reuses their ids.
+    """
+
+    __slots__ = ("_starts", "_slots", "duration_min")
+
+    def __init__(self, starts: Iterable[int] = (), *, duration_min: int) -> None:
+        self._starts = array("q", starts)
+        self._slots: dict[int, AvailableSlot] = {}
+        self.duration_min = duration_min
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[AvailableSlot], *, duration_min: int) -> SlotBatch:
+        return cls(sorted(int(slot.start_time.timestamp()) for slot in slots), duration_min=duration_min)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, *, duration_min: int) -> SlotBatch:
+        batch = cls(duration_min=duration_min)
+        batch._starts.frombytes(data)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable[SlotBatch], *, duration_min: int) -> SlotBatch:
+        """Concatenate batches that are already in chronological order."""
+        merged = cls(duration_min=duration_min)
+        for batch in batches:
+            merged._starts.extend(batch._starts)
+            if batch.duration_min == duration_min:
+                merged._slots.update(batch._slots)
+        return merged
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @overload
+    def __getitem__(self, index: int) -> AvailableSlot: ...
+    @overload
+    def __getitem__(self, index: slice) -> SlotBatch: ...
+    def __getitem__(self, index: int | slice) -> AvailableSlot | SlotBatch:
+        if isinstance(index, slice):
+            return self._derived(self._starts[index])
+        return self._slot(self._starts[index])
+
+    def __iter__(self) -> Iterator[AvailableSlot]:
+        return map(self._slot, self._starts)
+
+    def __repr__(self) -> str:
+        return f"SlotBatch(len={len(self)}, duration_min={self.duration_min})"
+
+    def to_bytes(self) -> bytes:
+        """The start times as packed epoch seconds, see `from_bytes`."""
+        return self._starts.tobytes()
+
+    def range(self, start_time: datetime.datetime, end_time: datetime.datetime) -> SlotBatch:
+        """Slots with start_time <= slot.start_time < end_time."""
+        lo = bisect.bisect_left(self._starts, math.ceil(start_time.timestamp()))
+        hi = bisect.bisect_left(self._starts, math.ceil(end_time.timestamp()))
+        return self[lo:hi]
+
+    def split_by_day(self) -> dict[datetime.date, SlotBatch]:
+        """Group the slots per UTC day."""
+        by_day: dict[datetime.date, SlotBatch] = {}
+        for start in self._starts:
+            day = datetime.date.fromordinal(_EPOCH_ORDINAL + start // 86400)
+            if (batch := by_day.get(day)) is None:
+                batch = by_day[day] = self._derived(())
+            batch._starts.append(start)
+        return by_day
+
+    def _derived(self, starts: Iterable[int]) -> SlotBatch:
+        batch = SlotBatch(starts, duration_min=self.duration_min)
+        batch._slots = self._slots
+        return batch
+
+    def _slot(self, start: int) -> AvailableSlot:
+        if (slot := self._slots.get(start)) is None:
+            slot = self._slots[start] = AvailableSlot(
+                start_time=datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+                duration_min=self.duration_min,
+            )
+        return slot
+
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
 
 
 class Calendar(Protocol):
+    @property
+    def key(self) -> str:
+        """Identifies the bookable resource, for a service every staff calendar at once."""
+        ...
+
+    @property
+    def hold_keys(self) -> list[str]:
+        """The keys of the calendars a booking may go to, a selected slot is held on one of them."""
+        return [self.key]
+
     async def initialize(self) -> None: ...
     async def schedule_appointment(
         self,
@@ -41,23 +200,108 @@ class Calendar(Protocol):
         start_time: datetime.datetime,
         attendee_email: str,
         user_name: str,
+        attendee_phone: str | None = None,
     ) -> None: ...
     async def list_available_slots(
         self, *, start_time: datetime.datetime, end_time: datetime.datetime
-    ) -> list[AvailableSlot]: ...
+    ) -> Sequence[AvailableSlot]: ...
+    async def find_bookings(
+        self,
+        *,
+        phone: str | None = None,
+        name: str | None = None,
+        start_time: datetime.datetime | None = None,
+        end_time: datetime.datetime | None = None,
+    ) -> list[Booking]:
+        """Upcoming bookings matching every given criterion, from `start_time` (default now) on."""
+        ...
+    async def reschedule_appointment(
+        self, *, booking_uid: str, start_time: datetime.datetime
+    ) -> Booking: ...
+    async def cancel_appointment(self, *, booking_uid: str, reason: str | None = None) -> None: ...
+
+
+class _SlotIndex:
+    """Slots bucketed per UTC day, each bucket kept sorted by start time."""
+
+    def __init__(self, slots: Iterable[AvailableSlot] = ()) -> None:
+        self._days: list[datetime.date] = []
+        self._starts: dict[datetime.date, list[datetime.datetime]] = {}
+        self._slots: dict[datetime.date, list[AvailableSlot]] = {}
+        self._len = 0
+        for slot in slots:
+            self.add(slot)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, slot: AvailableSlot) -> None:
+        day = _utc_day(slot.start_time)
+        if day not in self._starts:
+            bisect.insort(self._days, day)
+            self._starts[day] = []
+            self._slots[day] = []
+
+        starts = self._starts[day]
+        i = bisect.bisect_right(starts, slot.start_time)
+        starts.insert(i, slot.start_time)
+        self._slots[day].insert(i, slot)
+        self._len += 1
+
+    def remove(self, start_time: datetime.datetime) -> bool:
+        # emptied days are left in place, they cost nothing to skip
+        starts = self._starts.get(_utc_day(start_time))
+        if not starts:
+            return False
+
+        i = bisect.bisect_left(starts, start_time)
+        if i == len(starts) or starts[i] != start_time:
+            return False
+
+        del starts[i]
+        del self._slots[_utc_day(start_time)][i]
+        self._len -= 1
+        return True
+
+    def range(self, start_time: datetime.datetime, end_time: datetime.datetime) -> list[AvailableSlot]:
+        first = bisect.bisect_left(self._days, _utc_day(start_time))
+        last = bisect.bisect_right(self._days, _utc_day(end_time))
+
+        found: list[AvailableSlot] = []
+        for day in self._days[first:last]:
+            starts = self._starts[day]
+            lo = bisect.bisect_left(starts, start_time)
+            hi = bisect.bisect_left(starts, end_time)
+            found.extend(self._slots[day][lo:hi])
+        return found
+
+
+def _utc_day(dt: datetime.datetime) -> datetime.date:
+    return dt.astimezone(datetime.timezone.utc).date()
 
 
 class FakeCalendar(Calendar):
-    def __init__(self, *, timezone: str, slots: list[AvailableSlot] | None = None) -> None:
+    def __init__(
+        self,
+        *,
+        timezone: str,
+        slots: list[AvailableSlot] | None = None,
+        days: int = 90,
+        seed: int | None = None,
+    ) -> None:
         self.tz = ZoneInfo(timezone)
-        self._slots: list[AvailableSlot] = []
+        self._bookings = BookingIndex()
 
         if slots is not None:
-            self._slots.extend(slots)
+            self._slots = _SlotIndex(slots)
             return
 
+        # a seeded generator makes load tests reproducible across runs
+        rng = random.Random(seed)
+        generated: list[AvailableSlot] = []
+
         today = datetime.datetime.now(self.tz).date()
-        for day_offset in range(1, 90):  # generate slots for the next 90 days
+        for day_offset in range(1, days):  # generate slots for the next `days` days
             current_day = today + datetime.timedelta(days=day_offset)
             if current_day.weekday() >= 5:
                 continue
@@ -69,25 +313,88 @@ class FakeCalendar(Calendar):
                 for i in range(int((17 - 9) * 2))  # (17-9)=8 hours => 16 slots
             ]
 
-            num_slots = random.randint(3, 6)
-            chosen = random.sample(slots_in_day, num_slots)
+            num_slots = rng.randint(3, 6)
+            chosen = rng.sample(slots_in_day, num_slots)
 
             for slot_start in sorted(chosen):
-                self._slots.append(AvailableSlot(start_time=slot_start, duration_min=30))
+                generated.append(AvailableSlot(start_time=slot_start, duration_min=30))
+
+        self._slots = _SlotIndex(generated)
+
+    @property
+    def key(self) -> str:
+        # every fake calendar has its own slots
+        return f"fake:{id(self):x}"
 
     async def initialize(self) -> None:
         pass
 
     async def schedule_appointment(
-        self, *, start_time: datetime.datetime, attendee_email: str, user_name: str
+        self,
+        *,
+        start_time: datetime.datetime,
+        attendee_email: str,
+        user_name: str,
+        attendee_phone: str | None = None,
     ) -> None:
-        # fake it by just removing it from our slots list
-        self._slots = [slot for slot in self._slots if slot.start_time != start_time]
+        # fake it by just moving the slot from our slots index to the bookings
+        self._slots.remove(start_time)
+        self._bookings.put(
+            Booking(
+                uid=uuid.uuid4().hex,
+                start_time=start_time,
+                duration_min=30,
+                attendee_name=user_name,
+                attendee_email=attendee_email,
+                attendee_phone=attendee_phone,
+            )
+        )
 
     async def list_available_slots(
         self, *, start_time: datetime.datetime, end_time: datetime.datetime
     ) -> list[AvailableSlot]:
-        return [slot for slot in self._slots if start_time <= slot.start_time < end_time]
+        return self._slots.range(start_time, end_time)
+
+    async def find_bookings(
+        self,
+        *,
+        phone: str | None = None,
+        name: str | None = None,
+        start_time: datetime.datetime | None = None,
+        end_time: datetime.datetime | None = None,
+    ) -> list[Booking]:
+        return self._bookings.find(
+            phone=phone,
+            name=name,
+            start_time=start_time or datetime.datetime.now(datetime.timezone.utc),
+            end_time=end_time,
+        )
+
+    async def reschedule_appointment(
+        self, *, booking_uid: str, start_time: datetime.datetime
+    ) -> Booking:
+        if (booking := self._bookings.get(booking_uid)) is None:
+            raise BookingNotFoundError(f"Booking {booking_uid} not found")
+        if not self._slots.remove(start_time):
+            raise SlotUnavailableError(f"{start_time} is not available")
+
+        self._slots.add(AvailableSlot(start_time=booking.start_time, duration_min=booking.duration_min))
+        rescheduled = replace(booking, start_time=start_time)
+        self._bookings.put(rescheduled)
+        return rescheduled
+
+    async def cancel_appointment(self, *, booking_uid: str, reason: str | None = None) -> None:
+        if (booking := self._bookings.get(booking_uid)) is None:
+            raise BookingNotFoundError(f"Booking {booking_uid} not found")
+        self._bookings.remove(booking_uid)
+        self._slots.add(AvailableSlot(start_time=booking.start_time, duration_min=booking.duration_min))
+
+
+def make_fake_calendars(
+    count: int, *, timezone: str, days: int = 365, seed: int = 0
+) -> list[FakeCalendar]:
+    """Build `count` independent, reproducible fake calendars to use as a load-test backend."""
+    return [FakeCalendar(timezone=timezone, days=days, seed=seed + i) for i in range(count)]
 
 
 # --- cal.com impl ---
@@ -95,21 +402,113 @@ class FakeCalendar(Calendar):
 CAL_COM_EVENT_TYPE = "livekit-front-desk"
 EVENT_DURATION_MIN = 30
 BASE_URL = "https://api.cal.com/v2/"
+# concurrent /slots requests per calendar when a long window is fetched in chunks
+CALCOM_SLOTS_CONCURRENCY = 4
+BOOKINGS_PAGE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class EventType:
+    """A bookable cal.com event type, e.g. one service of one staff member."""
+
+    id: int
+    slug: str
+    title: str
+    duration_min: int
+
+    @classmethod
+    def from_json(cls, data: dict) -> EventType:
+        return cls(
+            id=data["id"],
+            slug=data.get("slug", ""),
+            title=data.get("title") or data.get("slug", ""),
+            duration_min=data.get("lengthInMinutes") or data.get("length") or EVENT_DURATION_MIN,
+        )
+
+
+@dataclass
+class CalComIdentity:
+    """The cal.com user and event type a calendar books into, resolved once per worker process."""
+
+    username: str
+    event_type_id: int
+    resolved_at: float = field(default_factory=time.monotonic)
+    # every event type of the account, resolved along with ours
+    event_types: tuple[EventType, ...] = ()
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.monotonic() - self.resolved_at > max_age
 
 
 class CalComCalendar(Calendar):
-    def __init__(self, *, api_key: str, timezone: str) -> None:
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        timezone: str,
+        slot_cache: SlotCache | None = None,
+        identity: CalComIdentity | None = None,
+        http_client: CalComHTTPClient | None = None,
+        event_type: EventType | None = None,
+    ) -> None:
         self.tz = ZoneInfo(timezone)
         self._api_key = api_key
+        self._slot_cache = slot_cache or shared_slot_cache()
+        self._identity: CalComIdentity | None = None
+        # pinned to another event type than the front-desk one, e.g. by the calendar registry
+        self._event_type = event_type
+        self._duration_min = event_type.duration_min if event_type else EVENT_DURATION_MIN
 
-        try:
-            self._http_session = http_context.http_session()
-        except RuntimeError:
-            self._http_session = aiohttp.ClientSession()
+        self._http_client = http_client
+        self._slots_limit = asyncio.Semaphore(CALCOM_SLOTS_CONCURRENCY)
 
         self._logger = logging.getLogger("cal.com")
 
+        if identity is not None:
+            self.set_identity(identity)
+
+    @property
+    def _http(self) -> CalComHTTPClient:
+        # resolved lazily, the shared client is bound to the event loop the calendar runs on
+        if self._http_client is None:
+            self._http_client = shared_calcom_client()
+        return self._http_client
+
+    @property
+    def identity(self) -> CalComIdentity | None:
+        return self._identity
+
+    def set_identity(self, identity: CalComIdentity) -> None:
+        self._identity = identity
+        self._lk_event_id = self._event_type.id if self._event_type else identity.event_type_id
+
+    def for_event_type(self, event_type: EventType) -> CalComCalendar:
+        """A calendar of the same account booking into `event_type`, sharing cache and connections."""
+        return CalComCalendar(
+            api_key=self._api_key,
+            timezone=self.tz.key,
+            slot_cache=self._slot_cache,
+            identity=self._identity,
+            http_client=self._http_client,
+            event_type=event_type,
+        )
+
+    @property
+    def key(self) -> str:
+        return f"cal.com:{self._lk_event_id}"
+
     async def initialize(self) -> None:
+        if self._identity is not None:
+            self._logger.info(
+                f"✅ Using prewarmed cal.com identity: {self._identity.username} "
+                f"(event type {self._identity.event_type_id})"
+            )
+            return
+
+        self.set_identity(await self.resolve_identity())
+
+    async def resolve_identity(self) -> CalComIdentity:
+        """Fetch the cal.com username and our event type id, creating the event type if needed."""
         self._logger.info("🔧 Initializing Cal.com calendar integration...")
         self._logger.info(f"🌐 Base URL: {BASE_URL}")
         self._logger.info(f"🔑 API Key present: {bool(self._api_key)}")
@@ -118,8 +517,11 @@ class CalComCalendar(Calendar):
         try:
             # Test API connection and get user info
             self._logger.info("👤 Fetching user information...")
-            async with self._http_session.get(
-                headers=self._build_headers(api_version="2024-06-14"), url=f"{BASE_URL}me/"
+            async with self._http.request(
+                "GET",
+                f"{BASE_URL}me/",
+                endpoint="me",
+                headers=self._build_headers(api_version="2024-06-14"),
             ) as resp:
                 self._logger.info(f"📡 /me/ response status: {resp.status}")
                 resp.raise_for_status()
@@ -131,9 +533,11 @@ class CalComCalendar(Calendar):
             # Get or create event type
             self._logger.info(f"📅 Looking for event type: {CAL_COM_EVENT_TYPE}")
             query = urlencode({"username": username})
-            async with self._http_session.get(
+            async with self._http.request(
+                "GET",
+                f"{BASE_URL}event-types/?{query}",
+                endpoint="event-types",
                 headers=self._build_headers(api_version="2024-06-14"),
-                url=f"{BASE_URL}event-types/?{query}",
             ) as resp:
                 self._logger.info(f"📡 /event-types/ response status: {resp.status}")
                 resp.raise_for_status()
@@ -144,8 +548,10 @@ class CalComCalendar(Calendar):
                     (event for event in data if event.get("slug") == CAL_COM_EVENT_TYPE), None
                 )
 
+                event_types = tuple(EventType.from_json(event) for event in data)
+
                 if lk_event_type:
-                    self._lk_event_id = lk_event_type["id"]
+                    event_type_id = lk_event_type["id"]
                     self._logger.info(f"✅ Found existing event type: {lk_event_type}")
                 else:
                     self._logger.info(f"🆕 Creating new event type: {CAL_COM_EVENT_TYPE}")
@@ -156,9 +562,11 @@ class CalComCalendar(Calendar):
                     }
                     self._logger.info(f"📋 Create event type payload: {create_payload}")
                     
-                    async with self._http_session.post(
+                    async with self._http.request(
+                        "POST",
+                        f"{BASE_URL}event-types",
+                        endpoint="create-event-type",
                         headers=self._build_headers(api_version="2024-06-14"),
-                        url=f"{BASE_URL}event-types",
                         json=create_payload,
                     ) as resp:
                         self._logger.info(f"📡 Create event type response status: {resp.status}")
@@ -167,17 +575,26 @@ class CalComCalendar(Calendar):
                         self._logger.info(f"🆕 Event type created: {create_response}")
                         self._logger.info(f"✅ Successfully added {CAL_COM_EVENT_TYPE} event type")
                         data = create_response["data"]
-                        self._lk_event_id = data["id"]
+                        event_type_id = data["id"]
+                        event_types += (EventType.from_json(data),)
 
-                self._logger.info(f"🎯 Final event type ID: {self._lk_event_id}")
+                self._logger.info(f"🎯 Final event type ID: {event_type_id}")
                 self._logger.info("✅ Cal.com calendar initialization completed successfully!")
-                
+                return CalComIdentity(
+                    username=username, event_type_id=event_type_id, event_types=event_types
+                )
+
         except Exception as e:
             self._logger.error(f"💥 Cal.com initialization failed: {type(e).__name__}: {e}")
             raise
 
     async def schedule_appointment(
-        self, *, start_time: datetime.datetime, attendee_email: str, user_name: str
+        self,
+        *,
+        start_time: datetime.datetime,
+        attendee_email: str,
+        user_name: str,
+        attendee_phone: str | None = None,
     ) -> None:
         start_time = start_time.astimezone(datetime.timezone.utc)
         
@@ -190,15 +607,20 @@ class CalComCalendar(Calendar):
             },
             "eventTypeId": self._lk_event_id,
         }
+        if attendee_phone:
+            # indexed, so the caller can find the booking again from their number
+            payload["attendee"]["phoneNumber"] = attendee_phone
         
         self._logger.info(f"🚀 Attempting to create booking with payload: {payload}")
         self._logger.info(f"📅 Booking URL: {BASE_URL}bookings")
         self._logger.info(f"🔑 Using event type ID: {self._lk_event_id}")
 
         try:
-            async with self._http_session.post(
+            async with self._http.request(
+                "POST",
+                f"{BASE_URL}bookings",
+                endpoint="bookings",
                 headers=self._build_headers(api_version="2024-08-13"),
-                url=f"{BASE_URL}bookings",
                 json=payload,
             ) as resp:
                 self._logger.info(f"📡 HTTP Response Status: {resp.status}")
@@ -221,6 +643,8 @@ class CalComCalendar(Calendar):
                     self._logger.error(f"❌ Cal.com API error: {message}")
                     self._logger.error(f"Full error details: {error}")
                     if "User either already has booking at this time or is not available" in message:
+                        # our cached view of that day is stale, someone else took the slot
+                        self._slot_cache.invalidate_day(self._lk_event_id, start_time.date())
                         raise SlotUnavailableError(error["message"])
                     # Raise other errors too
                     raise Exception(f"Cal.com API error: {message}")
@@ -232,61 +656,237 @@ class CalComCalendar(Calendar):
                 
                 self._logger.info("✅ Booking created successfully in Cal.com!")
                 self._logger.info(f"📋 Booking details: {data}")
-                
+                self._slot_cache.invalidate_day(self._lk_event_id, start_time.date())
+                if isinstance(booking := data.get("data"), dict) and "uid" in booking:
+                    self._bookings.put(Booking.from_calcom_json(booking))
+
+        except CalComUnavailableError as e:
+            # a timed out POST may still have gone through, don't trust that day anymore
+            self._slot_cache.invalidate_day(self._lk_event_id, start_time.date())
+            self._logger.error(f"💥 Cal.com unavailable during booking creation: {e}")
+            raise CalendarUnavailableError(str(e)) from e
         except Exception as e:
             self._logger.error(f"💥 Exception during booking creation: {type(e).__name__}: {e}")
             raise
 
     async def list_available_slots(
         self, *, start_time: datetime.datetime, end_time: datetime.datetime
-    ) -> list[AvailableSlot]:
+    ) -> Sequence[AvailableSlot]:
         try:
-            start_time = start_time.astimezone(datetime.timezone.utc)
-            end_time = end_time.astimezone(datetime.timezone.utc)
-            query = urlencode(
-                {
-                    "eventTypeId": self._lk_event_id,
-                    "start": start_time.isoformat(),
-                    "end": end_time.isoformat(),
-                }
+            return await self._slot_cache.get(
+                self._lk_event_id,
+                start_time=start_time,
+                end_time=end_time,
+                fetch=self._fetch_slots,
+            )
+        except Exception as e:
+            self._logger.error(f"Error fetching available slots: {type(e).__name__}: {e}")
+            stale = self._slot_cache.get_stale(
+                self._lk_event_id, start_time=start_time, end_time=end_time
             )
-            async with self._http_session.get(
-                headers=self._build_headers(api_version="2024-09-04"), url=f"{BASE_URL}slots/?{query}"
+            if stale is not None:
+                self._logger.warning("⚠️  Serving cached availability while cal.com is degraded")
+                return stale
+            raise CalendarUnavailableError(str(e)) from e
+
+    @property
+    def _bookings(self) -> BookingIndex:
+        # bookings are per account, every event type of it shares the index
+        assert self._identity is not None, "initialize() must be called first"
+        return shared_booking_index(self._identity.username)
+
+    async def find_bookings(
+        self,
+        *,
+        phone: str | None = None,
+        name: str | None = None,
+        start_time: datetime.datetime | None = None,
+        end_time: datetime.datetime | None = None,
+    ) -> list[Booking]:
+        try:
+            await self._refresh_bookings()
+        except Exception as e:
+            if self._bookings.synced_at is None:
+                raise CalendarUnavailableError(str(e)) from e
+            self._logger.warning(f"⚠️  Searching bookings in a stale index: {type(e).__name__}: {e}")
+
+        return self._bookings.find(
+            phone=phone,
+            name=name,
+            start_time=start_time or datetime.datetime.now(datetime.timezone.utc),
+            end_time=end_time,
+        )
+
+    async def reschedule_appointment(
+        self, *, booking_uid: str, start_time: datetime.datetime
+    ) -> Booking:
+        start_time = start_time.astimezone(datetime.timezone.utc)
+        data = await self._booking_action(
+            booking_uid,
+            "reschedule",
+            {"start": start_time.isoformat(), "reschedulingReason": "Requested by phone"},
+        )
+        # cal.com books the new time under a new uid and keeps the old one as cancelled
+        rescheduled = Booking.from_calcom_json(data)
+        self._bookings.put(rescheduled)
+        self._invalidate_booking_day(rescheduled)
+        return rescheduled
+
+    async def cancel_appointment(self, *, booking_uid: str, reason: str | None = None) -> None:
+        await self._booking_action(
+            booking_uid, "cancel", {"cancellationReason": reason or "Cancelled by phone"}
+        )
+
+    async def _booking_action(self, booking_uid: str, action: str, payload: dict) -> dict:
+        """
+        POST bookings/{uid}/{action} and drop the old booking from the index.
+
+        Raises:
+            BookingNotFoundError: if cal.com doesn't know the booking
+            SlotUnavailableError: if the new time of a reschedule is taken
+            CalendarUnavailableError: if cal.com can't be reached
+        """
+        previous = self._bookings.get(booking_uid)
+        try:
+            async with self._http.request(
+                "POST",
+                f"{BASE_URL}bookings/{booking_uid}/{action}",
+                endpoint=f"{action}-booking",
+                headers=self._build_headers(api_version="2024-08-13"),
+                json=payload,
             ) as resp:
+                # checked first, the body of a 404 may not be JSON
+                if resp.status == 404:
+                    self._bookings.remove(booking_uid)
+                    raise BookingNotFoundError(f"Booking {booking_uid} not found")
+                data = await resp.json(content_type=None) if resp.content_length != 0 else {}
+                if error := (data or {}).get("error"):
+                    message = error.get("message", str(error))
+                    if "already has booking" in message or "not available" in message:
+                        raise SlotUnavailableError(message)
+                    raise Exception(f"Cal.com API error: {message}")
                 resp.raise_for_status()
-                response_json = await resp.json()
-                
-                if "data" not in response_json:
-                    self._logger.error(f"Unexpected API response format: {response_json}")
-                    return []
-                    
-                raw_data = response_json["data"]
-                
-                available_slots = []
-                for _, slots in raw_data.items():
-                    if not isinstance(slots, list):
-                        continue
-                        
-                    for slot in slots:
-                        if not isinstance(slot, dict) or "start" not in slot:
-                            continue
-                            
-                        try:
-                            start_dt = datetime.datetime.fromisoformat(slot["start"].replace("Z", "+00:00"))
-                            available_slots.append(
-                                AvailableSlot(start_time=start_dt, duration_min=EVENT_DURATION_MIN)
-                            )
-                        except (ValueError, AttributeError) as e:
-                            self._logger.error(f"Error parsing slot start time: {e}")
-                            continue
-                            
-                return available_slots
-        except Exception as e:
-            self._logger.error(f"Error fetching available slots: {e}")
-            return []
+        except CalComUnavailableError as e:
+            if previous is not None:
+                self._invalidate_booking_day(previous)
+            raise CalendarUnavailableError(str(e)) from e
+
+        self._logger.info(f"✅ Booking {booking_uid} {action} done in Cal.com")
+        self._bookings.remove(booking_uid)
+        if previous is not None:
+            self._invalidate_booking_day(previous)
+        return data.get("data") or {}
+
+    def _invalidate_booking_day(self, booking: Booking) -> None:
+        self._slot_cache.invalidate_day(
+            booking.event_type_id or self._lk_event_id,
+            booking.start_time.astimezone(datetime.timezone.utc).date(),
+        )
+
+    async def _refresh_bookings(self) -> None:
+        """
+        Bring the booking index up to date, at most every BOOKING_INDEX_REFRESH_S. The first
+        sync pages through the upcoming bookings, later ones only fetch those updated since.
+        """
+        index = self._bookings
+        if time.monotonic() - index.refreshed_at < BOOKING_INDEX_REFRESH_S:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if index.synced_at is None:
+            params = {"status": "upcoming", "afterStart": now.isoformat()}
+        else:
+            params = {"afterUpdatedAt": index.synced_at.isoformat()}
+
+        changed: list[dict] = []
+        skip = 0
+        while True:
+            query = urlencode({**params, "take": BOOKINGS_PAGE_SIZE, "skip": skip})
+            async with self._http.request(
+                "GET",
+                f"{BASE_URL}bookings?{query}",
+                endpoint="list-bookings",
+                headers=self._build_headers(api_version="2024-08-13"),
+            ) as resp:
+                resp.raise_for_status()
+                page = (await resp.json())["data"]
+            changed.extend(page)
+            if len(page) < BOOKINGS_PAGE_SIZE:
+                break
+            skip += BOOKINGS_PAGE_SIZE
+
+        for data in changed:
+            try:
+                booking = Booking.from_calcom_json(data)
+            except (KeyError, ValueError) as e:
+                self._logger.error(f"Error parsing booking: {type(e).__name__}: {e}")
+                continue
+            end = booking.start_time + datetime.timedelta(minutes=booking.duration_min)
+            if data.get("status") in ("cancelled", "rejected") or end <= now:
+                index.remove(booking.uid)
+            else:
+                index.put(booking)
+
+        synced = [_parse_calcom_time(data["updatedAt"]) for data in changed if data.get("updatedAt")]
+        index.synced_at = max([*synced, index.synced_at or now])
+        index.refreshed_at = time.monotonic()
+
+    async def _fetch_slots(
+        self, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> SlotBatch:
+        start_time = start_time.astimezone(datetime.timezone.utc)
+        end_time = end_time.astimezone(datetime.timezone.utc)
+        query = urlencode(
+            {
+                "eventTypeId": self._lk_event_id,
+                "start": start_time.isoformat(),
+                "end": end_time.isoformat(),
+            }
+        )
+        async with self._slots_limit, self._http.request(
+            "GET",
+            f"{BASE_URL}slots/?{query}",
+            endpoint="slots",
+            headers=self._build_headers(api_version="2024-09-04"),
+        ) as resp:
+            resp.raise_for_status()
+            response_json = await resp.json()
+
+        if "data" not in response_json:
+            # raise rather than return [] so an empty answer never gets cached
+            raise ValueError(f"Unexpected API response format: {response_json}")
+
+        raw_data = response_json["data"]
+
+        starts: list[int] = []
+        for _, slots in raw_data.items():
+            if not isinstance(slots, list):
+                continue
+
+            for slot in slots:
+                if not isinstance(slot, dict) or "start" not in slot:
+                    continue
+
+                try:
+                    start_dt = datetime.datetime.fromisoformat(slot["start"].replace("Z", "+00:00"))
+                    starts.append(int(start_dt.timestamp()))
+                except (ValueError, AttributeError) as e:
+                    self._logger.error(f"Error parsing slot start time: {e}")
+                    continue
+
+        return SlotBatch(sorted(starts), duration_min=self._duration_min)
 
     def _build_headers(self, *, api_version: str | None = None) -> dict[str, str]:
         h = {"Authorization": f"Bearer {self._api_key}"}
         if api_version:
             h["cal-api-version"] = api_version
-        return h
\ No newline at end of file
+        return h
+
+async def fetch_calcom_identity(*, api_key: str) -> CalComIdentity:
+    """Resolve the cal.com identity outside of a job, e.g. from the worker prewarm function."""
+    http_client = CalComHTTPClient()
+    try:
+        cal = CalComCalendar(api_key=api_key, timezone="UTC", http_client=http_client)
+        return await cal.resolve_identity()
+    finally:
+        await http_client.aclose()
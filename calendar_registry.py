@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import json
+import logging
+import os
+from collections.abc import Mapping
+
+from calendar_api import (
+    AvailableSlot,
+    Booking,
+    BookingNotFoundError,
+    CalComCalendar,
+    Calendar,
+    SlotUnavailableError,
+)
+
+logger = logging.getLogger("calendar-registry")
+
+
+def load_services_config(
+    raw: str | Mapping[str, str | Mapping[str, str]] | None = None,
+) -> dict[str, dict[str, str]] | None:
+    """
+    Parse CALCOM_SERVICES, a JSON object mapping each service to the cal.com event type slug of
+    each staff member, or directly to a slug when anyone can do it:
+
+        {"Coupe": {"Anna": "coupe-anna", "Marc": "coupe-marc"}, "Brushing": "brushing"}
+
+    `raw` may also be the already parsed object, e.g. from a tenant's config.
+    """
+    raw = os.getenv("CALCOM_SERVICES") if raw is None else raw
+    if not raw:
+        return None
+
+    config = json.loads(raw) if isinstance(raw, str) else raw
+    return {
+        service: {"": staff} if isinstance(staff, str) else dict(staff)
+        for service, staff in config.items()
+    }
+
+
+class ServiceCalendar(Calendar):
+    """
+    One service across the staff members offering it.
+
+    Listings fetch every staff calendar concurrently and merge them, a time is available if
+    anyone is free then. A booking goes to the first staff member still free at that time.
+    """
+
+    def __init__(self, service: str, calendars: Mapping[str, Calendar], *, duration_min: int) -> None:
+        self.service = service
+        self.duration_min = duration_min
+        self._calendars = dict(calendars)
+
+    @property
+    def key(self) -> str:
+        return "+".join(sorted(cal.key for cal in self._calendars.values()))
+
+    @property
+    def hold_keys(self) -> list[str]:
+        # per staff calendar, so a slot held for "anyone" also conflicts with one held for a given staff member
+        return [key for cal in self._calendars.values() for key in cal.hold_keys]
+
+    @property
+    def staff(self) -> list[str]:
+        return [name for name in self._calendars if name]
+
+    def for_staff(self, staff: str) -> ServiceCalendar:
+        """
+        Raises:
+            KeyError: if `staff` doesn't offer this service
+        """
+        return ServiceCalendar(
+            self.service, {staff: self._calendars[staff]}, duration_min=self.duration_min
+        )
+
+    async def initialize(self) -> None:
+        await asyncio.gather(*(cal.initialize() for cal in self._calendars.values()))
+
+    async def list_available_slots(
+        self, *, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> list[AvailableSlot]:
+        per_staff = await asyncio.gather(
+            *(
+                cal.list_available_slots(start_time=start_time, end_time=end_time)
+                for cal in self._calendars.values()
+            )
+        )
+        if len(per_staff) == 1:
+            return list(per_staff[0])
+
+        merged: list[AvailableSlot] = []
+        for slot in heapq.merge(*per_staff, key=lambda slot: slot.start_time):
+            if not merged or merged[-1].start_time != slot.start_time:
+                merged.append(slot)
+        return merged
+
+    async def schedule_appointment(
+        self,
+        *,
+        start_time: datetime.datetime,
+        attendee_email: str,
+        user_name: str,
+        attendee_phone: str | None = None,
+    ) -> None:
+        candidates = list(self._calendars.items())
+        if len(candidates) > 1:
+            end_time = start_time + datetime.timedelta(minutes=self.duration_min)
+            free = await asyncio.gather(
+                *(
+                    cal.list_available_slots(start_time=start_time, end_time=end_time)
+                    for _, cal in candidates
+                )
+            )
+            candidates = [
+                candidate
+                for candidate, slots in zip(candidates, free)
+                if any(slot.start_time == start_time for slot in slots)
+            ]
+
+        for staff, cal in candidates:
+            try:
+                await cal.schedule_appointment(
+                    start_time=start_time,
+                    attendee_email=attendee_email,
+                    user_name=user_name,
+                    attendee_phone=attendee_phone,
+                )
+            except SlotUnavailableError:
+                continue  # taken meanwhile, the next staff member may still be free
+            logger.info(f"📅 {self.service} booked with {staff or 'the only calendar'}")
+            return
+
+        raise SlotUnavailableError(f"No staff member is free for {self.service} at {start_time}")
+
+    async def find_bookings(
+        self,
+        *,
+        phone: str | None = None,
+        name: str | None = None,
+        start_time: datetime.datetime | None = None,
+        end_time: datetime.datetime | None = None,
+    ) -> list[Booking]:
+        per_staff = await asyncio.gather(
+            *(
+                cal.find_bookings(phone=phone, name=name, start_time=start_time, end_time=end_time)
+                for cal in self._calendars.values()
+            )
+        )
+        # calendars of the same account find the same bookings
+        found = {booking.uid: booking for bookings in per_staff for booking in bookings}
+        return sorted(found.values(), key=lambda booking: booking.start_time)
+
+    async def reschedule_appointment(
+        self, *, booking_uid: str, start_time: datetime.datetime
+    ) -> Booking:
+        for cal in self._calendars.values():
+            try:
+                return await cal.reschedule_appointment(booking_uid=booking_uid, start_time=start_time)
+            except BookingNotFoundError:
+                continue  # booked with another staff member
+        raise BookingNotFoundError(f"Booking {booking_uid} not found for {self.service}")
+
+    async def cancel_appointment(self, *, booking_uid: str, reason: str | None = None) -> None:
+        for cal in self._calendars.values():
+            try:
+                return await cal.cancel_appointment(booking_uid=booking_uid, reason=reason)
+            except BookingNotFoundError:
+                continue
+        raise BookingNotFoundError(f"Booking {booking_uid} not found for {self.service}")
+
+
+class CalendarRegistry:
+    """
+    The services of a salon and the calendars of the staff members offering them.
+
+    Calendars of the same account share the slot cache and the HTTP connections, so asking for
+    a service with several staff members costs a single round trip of concurrent requests.
+    """
+
+    def __init__(self, services: Mapping[str, ServiceCalendar]) -> None:
+        self._services = dict(services)
+
+    @classmethod
+    def from_calcom(
+        cls, cal: CalComCalendar, config: Mapping[str, Mapping[str, str]] | None = None
+    ) -> CalendarRegistry:
+        """
+        Build the registry from the event types resolved with the calendar identity. Without a
+        config every event type is a service of its own.
+        """
+        if cal.identity is None:
+            raise ValueError("The cal.com identity must be resolved first")
+
+        event_types = {event_type.slug: event_type for event_type in cal.identity.event_types}
+        if config is None:
+            config = {event_type.title: {"": slug} for slug, event_type in event_types.items()}
+
+        services: dict[str, ServiceCalendar] = {}
+        for service, staff_slugs in config.items():
+            calendars: dict[str, Calendar] = {}
+            durations: set[int] = set()
+            for staff, slug in staff_slugs.items():
+                if (event_type := event_types.get(slug)) is None:
+                    logger.warning(f"⚠️  Unknown cal.com event type {slug!r} for {service}, skipped")
+                    continue
+                calendars[staff] = cal.for_event_type(event_type)
+                durations.add(event_type.duration_min)
+
+            if calendars:
+                services[service] = ServiceCalendar(service, calendars, duration_min=max(durations))
+
+        return cls(services)
+
+    @property
+    def services(self) -> list[str]:
+        return list(self._services)
+
+    def calendar(self, service: str, staff: str | None = None) -> ServiceCalendar:
+        """
+        Raises:
+            KeyError: if the service, or the staff member for it, is unknown
+        """
+        entry = self._services[service]
+        return entry.for_staff(staff) if staff else entry
+
+    def describe(self) -> list[str]:
+        """One line per service: <service> (<duration> min): <staff>, ..."""
+        return [
+            f"{service} ({entry.duration_min} min)" + (f": {', '.join(entry.staff)}" if entry.staff else "")
+            for service, entry in self._services.items()
+        ]
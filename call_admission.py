@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import os
+import time
+
+# calls the agent workers can take at once, e.g. workers x FRONTDESK_MAX_JOBS; 0 admits every call
+FRONTDESK_CALL_CAPACITY = int(os.getenv("FRONTDESK_CALL_CAPACITY", "0"))
+# a caller over capacity is held this long before each new try
+CALL_HOLD_S = int(os.getenv("CALL_HOLD_S", "2"))
+CALL_HOLD_MAX_TRIES = int(os.getenv("CALL_HOLD_MAX_TRIES", "3"))
+# number the call is forwarded to once it waited CALL_HOLD_MAX_TRIES times, unset hangs up
+CALL_OVERFLOW_NUMBER = os.getenv("CALL_OVERFLOW_NUMBER") or None
+# how often the busy rooms are recounted from LiveKit
+CALL_OCCUPANCY_REFRESH_S = 1.0
+
+
+class CallAdmission:
+    """
+    Decides whether an incoming call goes to the agents now or waits.
+
+    `busy` is the number of LiveKit rooms with participants, as last counted, plus the calls
+    admitted since: a burst of calls between two counts can't all be let through.
+    """
+
+    def __init__(self, *, capacity: int = FRONTDESK_CALL_CAPACITY) -> None:
+        self.capacity = capacity
+        self._counted = 0
+        self._admitted_since = 0
+        self.counted_at = float("-inf")
+
+    @property
+    def busy(self) -> int:
+        return self._counted + self._admitted_since
+
+    def update(self, busy_rooms: int) -> None:
+        """Record a fresh count of the rooms in use."""
+        self._counted = busy_rooms
+        self._admitted_since = 0
+        self.counted_at = time.monotonic()
+
+    def admit(self) -> bool:
+        if self.capacity > 0 and self.busy >= self.capacity:
+            return False
+        self._admitted_since += 1
+        return True
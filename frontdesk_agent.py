@@ -4,16 +4,41 @@ import asyncio
 import datetime
 import logging
 import os
+import sqlite3
 import sys
-from dataclasses import dataclass
+import time
+import uuid
+from dataclasses import dataclass, field
 from typing import Literal
 from zoneinfo import ZoneInfo
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from calendar_api import AvailableSlot, CalComCalendar, Calendar, FakeCalendar, SlotUnavailableError
+from calendar_api import (
+    AvailableSlot,
+    Booking,
+    BookingNotFoundError,
+    CalComCalendar,
+    CalComIdentity,
+    Calendar,
+    CalendarUnavailableError,
+    FakeCalendar,
+    SlotUnavailableError,
+    fetch_calcom_identity,
+)
+from calcom_http import shared_calcom_client
+from calcom_webhook import CALCOM_INVALIDATE_TOPIC, decode_invalidation
+from calendar_registry import CalendarRegistry, load_services_config
 from dotenv import load_dotenv
 from phone_number_workflow import GetPhoneNumberTask, GetPhoneNumberResult
+from slot_cache import SLOT_FETCH_CHUNK_DAYS, shared_slot_cache
+from slot_format import DETAIL_MAX_SLOTS, SlotFormatter
+from slot_holds import SLOT_HOLD_TTL_S, SlotHolds
+from slot_registry import SlotRegistry
+from slot_snapshot import SlotSnapshot
+from slot_window import SlotWindow
+from tenants import Tenant, tenant_from_metadata
+from worker_load import FRONTDESK_LOAD_THRESHOLD, WorkerLoad
 from user_name_workflow import GetUserNameTask, GetUserNameResult
 from sms_manager import SMSManager
 
@@ -21,6 +46,7 @@ from livekit.agents import (
     Agent,
     AgentSession,
     JobContext,
+    JobProcess,
     MetricsCollectedEvent,
     RunContext,
     ToolError,
@@ -30,6 +56,7 @@ from livekit.agents import (
     function_tool,
     metrics,
 )
+from livekit import rtc
 from livekit.plugins import elevenlabs, deepgram, openai, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
@@ -39,21 +66,88 @@ load_dotenv()
 @dataclass
 class Userdata:
     cal: Calendar
+    # the salon's services and staff, when it books more than one kind of appointment
+    services: CalendarRegistry | None = None
+    # in-process holds unless the entrypoint shares them between workers
+    holds: SlotHolds = field(default_factory=lambda: SlotHolds(holder=uuid.uuid4().hex, path=None))
 
 
 logger = logging.getLogger("front-desk")
 
+# language of the calls, used for speech recognition and the slot listings (fr, de or en)
+CALL_LANGUAGE = os.getenv("FRONTDESK_LANGUAGE", "fr")
+
+DEFAULT_RANGE_DAYS = 14
+# the prefetched window is a bit longer than the default one so it still covers it this long after
+PREFETCH_MAX_AGE_S = 5 * 60
+# a longer search answers with its first week if the whole window isn't there by then
+LONG_RANGE_WAIT_S = 1.5
+
 # Initialize SMS manager
 sms_manager = SMSManager()
 
+
+@dataclass(frozen=True)
+class _CallPhrases:
+    # completes "Parle uniquement ..." in the instructions
+    speak: str
+    greeting: str
+    greeting_at_salon: str
+    confirmation: str
+
+
+# what the agent says itself, in the language of the call (fr, de or en)
+CALL_PHRASES = {
+    "fr": _CallPhrases(
+        speak="en français",
+        greeting="Bonjour et bienvenue ! Je suis l'assistant du salon. Souhaitez-vous prendre un rendez-vous ou avez-vous une question ?",
+        greeting_at_salon="Bonjour et bienvenue à {salon_name} ! Je suis l'assistant du salon. Souhaitez-vous prendre un rendez-vous ou avez-vous une question ?",
+        confirmation="Merci, {user_name}. Votre rendez-vous est bien pris pour le {when}. Un SMS de confirmation va être envoyé à votre numéro de téléphone.",
+    ),
+    "de": _CallPhrases(
+        speak="en allemand",
+        greeting="Guten Tag und willkommen! Ich bin der Assistent des Salons. Möchten Sie einen Termin vereinbaren oder haben Sie eine Frage?",
+        greeting_at_salon="Guten Tag und willkommen bei {salon_name}! Ich bin der Assistent des Salons. Möchten Sie einen Termin vereinbaren oder haben Sie eine Frage?",
+        confirmation="Vielen Dank, {user_name}. Der Termin wurde erfolgreich für {when} vereinbart. Eine Bestätigungs-SMS wird an Ihre Telefonnummer gesendet.",
+    ),
+    "en": _CallPhrases(
+        speak="en anglais",
+        greeting="Hello and welcome! I'm the salon's assistant. Would you like to book an appointment or do you have a question?",
+        greeting_at_salon="Hello and welcome to {salon_name}! I'm the salon's assistant. Would you like to book an appointment or do you have a question?",
+        confirmation="Thank you, {user_name}. Your appointment is booked for {when}. A confirmation text message will be sent to your phone number.",
+    ),
+}
+
+
+def _log_background_listing_error(task: asyncio.Task[list[AvailableSlot]]) -> None:
+    if not task.cancelled() and (error := task.exception()) is not None:
+        logger.warning(f"⚠️  Background availability listing failed: {type(error).__name__}: {error}")
+
+
 class FrontDeskAgent(Agent):
-    def __init__(self, *, timezone: str) -> None:
+    def __init__(
+        self,
+        *,
+        timezone: str,
+        language: str = CALL_LANGUAGE,
+        several_services: bool = False,
+        salon_name: str = "",
+        greeting: str | None = None,
+        extra_instructions: str = "",
+    ) -> None:
         self.tz = ZoneInfo(timezone)
+        self.language = language
+        self.phrases = phrases = CALL_PHRASES.get(language, CALL_PHRASES["en"])
+        self.greeting = greeting or (
+            phrases.greeting_at_salon.format(salon_name=salon_name) if salon_name else phrases.greeting
+        )
         today = datetime.datetime.now(self.tz).strftime("%A, %B %d, %Y")
 
         super().__init__(
             instructions=(
-                f"Tu es Front-Desk, un assistant vocal utile, efficace et courtois. "
+                f"Tu es Front-Desk, un assistant vocal utile, efficace et courtois"
+                + (f" pour {salon_name}. " if salon_name else ". ")
+                + f"Parle uniquement {phrases.speak} avec l’utilisateur, et traduis dans cette langue les exemples de phrases ci-dessous. "
                 f"Nous sommes le {today}. Ta mission principale est d’aider l’utilisateur à réserver un rendez-vous. "
                 "La conversation est vocale — parle naturellement, clairement et avec concision. "
                 "Commence toujours par saluer chaleureusement l’utilisateur, puis oriente immédiatement vers la prise de rendez‑vous ou demande s’il a une question. "
@@ -61,6 +155,8 @@ class FrontDeskAgent(Agent):
                 "Par exemple, enchaîne avec : ‘Souhaitez-vous réserver un horaire ?’. "
                 "IMPORTANT : Quand tu dois consulter une information qui peut prendre du temps (comme vérifier le calendrier avec `list_available_slots`), annonce-le d’abord. Par exemple : ‘Un instant, je consulte les disponibilités pour vous.’ puis appelle la fonction. "
                 "Une fois que tu as la liste des créneaux, NE LA LIS PAS EN ENTIER. Synthétise-la en proposant des options générales. Par exemple : 'J'ai plusieurs créneaux disponibles en début de semaine prochaine, notamment lundi matin et mardi après-midi.' ou 'Je vois des disponibilités pour jeudi en fin de journée.' Ensuite, demande à l\'utilisateur ce qui l\'arrangerait pour affiner la recherche. "
+                "Si la liste est résumée par jour, appelle `list_available_slots_on_day` pour connaître les horaires exacts d’un jour avant de proposer une heure précise. "
+                "Dès que l’utilisateur choisit un créneau, appelle `select_slot` pour le réserver, puis demande ses coordonnées. "
                 "Formule des créneaux comme ‘lundi en fin de matinée’ ou ‘mardi en début d’après-midi’ — évite les fuseaux horaires, les timestamps, et évite de dire ‘AM’ ou ‘PM’. "
                 "Ne mentionne l’année que si elle est différente de l’année en cours. "
                 "Propose quelques options à la fois, marque une pause pour la réponse, puis guide l’utilisateur vers la confirmation. "
@@ -69,11 +165,87 @@ class FrontDeskAgent(Agent):
                 "Exemples : 'Pourriez‑vous me fournir votre adresse email ?', 'Pourriez‑vous également me fournir votre numéro de téléphone ?', 'Pourriez‑vous me donner votre nom et prénom, s'il vous plaît ?'. "
                 "IMPORTANT pour les emails : Si tu ne comprends pas bien une adresse email, demande poliment à l'utilisateur de l'épeler lettre par lettre. "
                 "Si une information n'est pas claire, dis explicitement : 'Je n'ai pas bien compris, pouvez-vous répéter plus lentement ?' "
+                "Si l’utilisateur veut déplacer ou annuler un rendez-vous, retrouve-le avec `find_my_bookings` (son numéro de téléphone ou son nom), "
+                "confirme lequel avec lui, puis appelle `cancel_booking`, ou cherche un nouveau créneau et appelle `reschedule_booking`. "
                 "Garde toujours la conversation fluide — sois proactif, naturel et centré sur l'objectif : aider l'utilisateur à réserver facilement."
+                + (
+                    " Le salon propose plusieurs prestations : demande laquelle l’utilisateur souhaite (et avec qui, s’il a une préférence), "
+                    "appelle `list_services` si besoin, puis `choose_service` avant de chercher des créneaux."
+                    if several_services
+                    else ""
+                )
+                + (f" {extra_instructions}" if extra_instructions else "")
             )
         )
 
-        self._slots_map: dict[str, AvailableSlot] = {}
+        self._slots = SlotRegistry()
+        self._window: SlotWindow | None = None
+        # the service (and staff member) chosen by the caller, if the salon has several
+        self._calendar: Calendar | None = None
+        self._held: AvailableSlot | None = None
+        self._prefetch: asyncio.Task[list[AvailableSlot]] | None = None
+        # the caller's bookings found during the call, by uid
+        self._bookings: dict[str, Booking] = {}
+        # outbox keys of the confirmations sent during this call
+        self.sms_keys: list[str] = []
+
+    @property
+    def calendar(self) -> Calendar:
+        return self._calendar or self.session.userdata.cal
+
+    @property
+    def window(self) -> SlotWindow:
+        if self._window is None:
+            self._window = SlotWindow(self.calendar)
+        return self._window
+
+    async def on_enter(self) -> None:
+        # fetch the default window while the greeting plays, the first listing then shares its fetch
+        if self._prefetch is None:
+            now = datetime.datetime.now(self.tz)
+            self._prefetch = asyncio.create_task(
+                self.window.list(
+                    start_time=now,
+                    end_time=now + datetime.timedelta(days=DEFAULT_RANGE_DAYS, seconds=PREFETCH_MAX_AGE_S),
+                )
+            )
+            self._prefetch.add_done_callback(_log_background_listing_error)
+
+    async def _list_long_range(
+        self, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> tuple[list[AvailableSlot], bool]:
+        """
+        List a window longer than a fetch chunk, returns the slots and whether they are partial.
+
+        If the whole window takes longer than LONG_RANGE_WAIT_S, only its first chunk is returned
+        (its fetch is shared with the one in flight), the rest keeps filling the slot cache.
+        """
+        full = asyncio.create_task(self.window.list(start_time=start_time, end_time=end_time))
+        try:
+            return await asyncio.wait_for(asyncio.shield(full), LONG_RANGE_WAIT_S), False
+        except asyncio.TimeoutError:
+            full.add_done_callback(_log_background_listing_error)
+
+        first_end = start_time + datetime.timedelta(days=SLOT_FETCH_CHUNK_DAYS)
+        return await self.window.list(start_time=start_time, end_time=first_end), True
+
+    def invalidate_availability(self) -> None:
+        if self._window is not None:
+            self._window.invalidate()
+
+    def _forget_slot(self, slot: AvailableSlot) -> None:
+        self._slots.discard(slot.start_time)
+        self.window.discard(slot.start_time)
+        if self._held == slot:
+            self._held = None
+
+    async def _without_held_slots(
+        self, slots: list[AvailableSlot], start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> list[AvailableSlot]:
+        """Drop the slots other callers are about to book."""
+        cal = self.calendar
+        held = await self.session.userdata.holds.held_by_others(cal.hold_keys, start_time, end_time)
+        return [slot for slot in slots if slot.start_time not in held] if held else slots
 
     async def start(self, ctx: AgentSession) -> None:
         """
@@ -82,11 +254,77 @@ class FrontDeskAgent(Agent):
         """
         await super().start(ctx)
         await self.chat_ctx.say(
-            "Bonjour et bienvenue ! Je suis l'assistant du salon. "
-            "Souhaitez-vous prendre un rendez-vous ou avez-vous une question ?",
+            self.greeting,
             add_to_chat_ctx=False,  # Don't add the initial greeting to the LLM context
         )
 
+    @function_tool
+    async def list_services(self, ctx: RunContext[Userdata]) -> str:
+        """
+        Return the services that can be booked, one per line, with their duration and the staff
+        members offering them:
+
+        <service> (<duration> min): <staff>, ...
+        """
+        if ctx.userdata.services is None:
+            return "Only one kind of appointment can be booked here."
+        return "\n".join(ctx.userdata.services.describe())
+
+    @function_tool
+    async def choose_service(
+        self, ctx: RunContext[Userdata], service: str, staff: str | None = None
+    ) -> str:
+        """
+        Choose the service (and optionally the staff member) the user wants to book, before
+        listing available slots. Slots listed earlier are only valid for the previous service.
+
+        Args:
+            service: A service name exactly as returned by list_services.
+            staff: A staff member offering the service, only if the user asked for someone.
+        """
+        if (services := ctx.userdata.services) is None:
+            return "Only one kind of appointment can be booked here."
+
+        try:
+            calendar = services.calendar(service, staff)
+        except KeyError:
+            raise ToolError(
+                f"Unknown service or staff member. Available: {'; '.join(services.describe())}"
+            ) from None
+
+        if self._held is not None:
+            await ctx.userdata.holds.release(self.calendar.hold_keys, self._held.start_time)
+            self._held = None
+        self._calendar = calendar
+        self._window = None
+        # slot ids listed so far belong to the previous service and can't be booked with this one
+        self._slots = SlotRegistry()
+        return f"{service} selected ({calendar.duration_min} min)" + (f" with {staff}" if staff else "")
+
+    @function_tool
+    async def select_slot(self, ctx: RunContext[Userdata], slot_id: str) -> str:
+        """
+        Reserve the slot the user picked while their details are collected, so no other caller
+        can take it meanwhile. Call it as soon as the user chooses a slot.
+
+        Args:
+            slot_id: The identifier for the selected time slot.
+        """
+        if not (slot := self._slots.get(slot_id)):
+            raise ToolError(f"error: slot {slot_id} was not found")
+
+        cal, holds = self.calendar, ctx.userdata.holds
+        if self._held is not None and self._held != slot:
+            await holds.release(cal.hold_keys, self._held.start_time)
+            self._held = None
+
+        if not await holds.hold(cal.hold_keys, slot.start_time):
+            self._forget_slot(slot)
+            raise ToolError("Another caller is booking this slot right now, offer another one")
+
+        self._held = slot
+        return f"Slot {slot_id} is reserved for {SLOT_HOLD_TTL_S / 60:.0f} minutes."
+
     @function_tool
     async def schedule_appointment(
         self,
@@ -105,49 +343,179 @@ class FrontDeskAgent(Agent):
             user_email: The email address of the user.
             user_phone_number: The phone number of the user.
         """
-        if not (slot := self._slots_map.get(slot_id)):
+        if not (slot := self._slots.get(slot_id)):
             raise ToolError(f"error: slot {slot_id} was not found")
 
         ctx.disallow_interruptions()
+
+        cal, holds = self.calendar, ctx.userdata.holds
+        if not await holds.hold(cal.hold_keys, slot.start_time):
+            self._forget_slot(slot)
+            raise ToolError("Another caller is booking this slot right now, offer another one")
+
+        if not self._slots.is_fresh(slot_id):
+            # listed a while ago, make sure nobody took it in the meantime before booking
+            try:
+                still_free = await cal.list_available_slots(
+                    start_time=slot.start_time,
+                    end_time=slot.start_time + datetime.timedelta(minutes=slot.duration_min),
+                )
+            except CalendarUnavailableError:
+                still_free = [slot]  # the booking request below gets the final say
+            if slot not in still_free:
+                self._forget_slot(slot)
+                await holds.release(cal.hold_keys, slot.start_time)
+                raise ToolError("This slot isn't available anymore")
         
         try:
             # The user information is now passed directly as arguments.
             # No need to call the workflows here anymore.
             
-            await ctx.userdata.cal.schedule_appointment(
+            await cal.schedule_appointment(
                 start_time=slot.start_time,
                 attendee_email=user_email,
                 user_name=user_name,
+                attendee_phone=user_phone_number,
             )
             
-            local = slot.start_time.astimezone(self.tz)
-            appointment_details = f"{local.strftime('%A, %B %d, %Y at %H:%M %Z')}"
+            formatter = SlotFormatter(tz=self.tz, now=datetime.datetime.now(self.tz), language=self.language)
+            appointment_details = formatter.appointment(slot.start_time)
             
-            # Use the provided phone number to send the SMS
-            sms_sent = sms_manager.send_confirmation_sms(
-                user_phone_number, appointment_details, language="de"
+            # The SMS is persisted in the outbox and delivered in the background,
+            # the confirmation is spoken right away
+            booking_key = f"{slot.start_time.isoformat()}|{user_phone_number}"
+            await sms_manager.enqueue_confirmation_sms(
+                user_phone_number,
+                appointment_details,
+                language=self.language,
+                booking_key=booking_key,
             )
+            self.sms_keys.append(booking_key)
+            self._forget_slot(slot)
+            await holds.release(cal.hold_keys, slot.start_time)
+
+            confirmation_message = self.phrases.confirmation.format(user_name=user_name, when=appointment_details)
 
-            confirmation_message = (
-                f"Vielen Dank, {user_name}. Der Termin wurde erfolgreich für {appointment_details} vereinbart."
-            )
-            if sms_sent:
-                confirmation_message += (
-                    " Eine Bestätigungs-SMS wurde an Ihre Telefonnummer gesendet."
-                )
-            else:
-                confirmation_message += (
-                    " Wir konnten keine Bestätigungs-SMS an Ihre Telefonnummer senden."
-                )
-                
             return confirmation_message
             
         except SlotUnavailableError:
+            self._forget_slot(slot)
+            await holds.release(cal.hold_keys, slot.start_time)
             raise ToolError("This slot isn't available anymore") from None
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The booking system isn't responding right now, the appointment could not be "
+                "confirmed. Apologize and offer to try again in a moment."
+            ) from None
         except Exception as e:
             logger.error(f"Erreur lors de la réservation: {e}")
             raise ToolError(f"Je rencontre un problème technique lors de la réservation. Pouvez-vous réessayer ?") from None
 
+    @function_tool
+    async def find_my_bookings(
+        self, ctx: RunContext[Userdata], phone_number: str | None = None, name: str | None = None
+    ) -> str:
+        """
+        Find the user's upcoming appointments, to reschedule or cancel one. Returns one per line:
+
+        <booking_id> – <Weekday>, <Month> <Day>, <Year> at <HH:MM> <TZ> (<relative time>) – <name>
+
+        Args:
+            phone_number: The phone number the appointment was booked with.
+            name: The full name the appointment was booked under.
+        """
+        if not phone_number and not name:
+            raise ToolError("Ask the user for the phone number or the name used for the booking")
+
+        try:
+            bookings = await self.calendar.find_bookings(phone=phone_number or None, name=name or None)
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The booking system isn't responding right now. Apologize and offer to try again "
+                "in a moment."
+            ) from None
+
+        formatter = SlotFormatter(
+            tz=self.tz, now=datetime.datetime.now(self.tz), language=self.language
+        )
+        self._bookings.update((booking.uid, booking) for booking in bookings)
+        return "\n".join(formatter.booking_line(booking) for booking in bookings) or (
+            "No upcoming appointment found. Ask the user to check the phone number or name."
+        )
+
+    @function_tool
+    async def reschedule_booking(self, ctx: RunContext[Userdata], booking_id: str, slot_id: str) -> str:
+        """
+        Move one of the user's appointments to an available slot, once the user confirmed both.
+
+        Args:
+            booking_id: The identifier returned by find_my_bookings.
+            slot_id: The identifier of the new time slot.
+        """
+        if booking_id not in self._bookings:
+            raise ToolError(f"error: booking {booking_id} was not found, call find_my_bookings first")
+        if not (slot := self._slots.get(slot_id)):
+            raise ToolError(f"error: slot {slot_id} was not found")
+
+        ctx.disallow_interruptions()
+
+        cal, holds = self.calendar, ctx.userdata.holds
+        if not await holds.hold(cal.hold_keys, slot.start_time):
+            self._forget_slot(slot)
+            raise ToolError("Another caller is booking this slot right now, offer another one")
+
+        try:
+            booking = await cal.reschedule_appointment(booking_uid=booking_id, start_time=slot.start_time)
+        except SlotUnavailableError:
+            self._forget_slot(slot)
+            raise ToolError("This slot isn't available anymore") from None
+        except BookingNotFoundError:
+            del self._bookings[booking_id]
+            raise ToolError("This appointment doesn't exist anymore, it may have been cancelled") from None
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The booking system isn't responding right now, the appointment was not moved. "
+                "Apologize and offer to try again in a moment."
+            ) from None
+        finally:
+            await holds.release(cal.hold_keys, slot.start_time)
+
+        del self._bookings[booking_id]
+        self._bookings[booking.uid] = booking
+        self._forget_slot(slot)
+        self.invalidate_availability()  # the previous time is free again
+        local = booking.start_time.astimezone(self.tz)
+        return f"The appointment was moved to {local.strftime('%A, %B %d, %Y at %H:%M %Z')}."
+
+    @function_tool
+    async def cancel_booking(self, ctx: RunContext[Userdata], booking_id: str) -> str:
+        """
+        Cancel one of the user's appointments, once the user confirmed which one.
+
+        Args:
+            booking_id: The identifier returned by find_my_bookings.
+        """
+        if booking_id not in self._bookings:
+            raise ToolError(f"error: booking {booking_id} was not found, call find_my_bookings first")
+
+        ctx.disallow_interruptions()
+
+        try:
+            await self.calendar.cancel_appointment(booking_uid=booking_id)
+        except BookingNotFoundError:
+            del self._bookings[booking_id]
+            raise ToolError("This appointment doesn't exist anymore, it may have been cancelled already") from None
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The booking system isn't responding right now, the appointment was not cancelled. "
+                "Apologize and offer to try again in a moment."
+            ) from None
+
+        booking = self._bookings.pop(booking_id)
+        self.invalidate_availability()
+        local = booking.start_time.astimezone(self.tz)
+        return f"The appointment of {local.strftime('%A, %B %d, %Y at %H:%M %Z')} is cancelled."
+
     @function_tool
     async def list_available_slots(
         self, ctx: RunContext[Userdata], range: Literal["+2week", "+1month", "+3month", "default"]
@@ -157,6 +525,13 @@ class FrontDeskAgent(Agent):
 
         <slot_id> – <Weekday>, <Month> <Day>, <Year> at <HH:MM> <TZ> (<relative time>)
 
+        Dates and relative times are written in the language of the call.
+
+        Long listings are summarised with one line per day instead, giving the number of
+        slots per part of the day and a few of their ids:
+
+        <Weekday>, <Month> <Day>, <Year> (<relative time>): <part of day> <count> (<slot_id> <HH:MM>, ...), ...
+
         You must infer the appropriate ``range`` implicitly from the
         conversational context and **must not** prompt the user to pick a value
         explicitly.
@@ -167,45 +542,89 @@ class FrontDeskAgent(Agent):
         
 
         now = datetime.datetime.now(self.tz)
-        lines: list[str] = []
 
         if range == "+2week" or range == "default":
-            range_days = 14
+            range_days = DEFAULT_RANGE_DAYS
         elif range == "+1month":
             range_days = 30
         elif range == "+3month":
             range_days = 90
 
-        for slot in await ctx.userdata.cal.list_available_slots(
-            start_time=now, end_time=now + datetime.timedelta(days=range_days)
-        ):
-            local = slot.start_time.astimezone(self.tz)
-            delta = local - now
-            days = delta.days
-            seconds = delta.seconds
-
-            if local.date() == now.date():
-                if seconds < 3600:
-                    rel = "in less than an hour"
-                else:
-                    rel = "later today"
-            elif local.date() == (now.date() + datetime.timedelta(days=1)):
-                rel = "tomorrow"
-            elif days < 7:
-                rel = f"in {days} days"
-            elif days < 14:
-                rel = "in 1 week"
+        end = now + datetime.timedelta(days=range_days)
+        partial = False
+        try:
+            if range_days > SLOT_FETCH_CHUNK_DAYS:
+                slots, partial = await self._list_long_range(now, end)
             else:
-                rel = f"in {days // 7} weeks"
+                slots = await self.window.list(start_time=now, end_time=end)
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The calendar can't be reached right now. This does not mean there is no "
+                "availability; apologize and offer to check again in a moment."
+            ) from None
+
+        slots = await self._without_held_slots(list(slots), now, end)
+        formatter = SlotFormatter(tz=self.tz, now=now, language=self.language)
+        if len(slots) <= DETAIL_MAX_SLOTS:
+            lines = [formatter.slot_line(slot) for slot in slots]
+            shown = slots
+        else:
+            lines, shown = formatter.summarize_by_day(slots)
+            lines.insert(
+                0,
+                f"{len(slots)} slots, summarised per day. Call list_available_slots_on_day for the "
+                "exact times of a day.",
+            )
+        for slot in shown:
+            self._slots.add(slot)
 
+        if partial:
             lines.append(
-                f"{slot.unique_hash} – {local.strftime('%A, %B %d, %Y')} at "
-                f"{local:%H:%M} {local.tzname()} ({rel})"
+                f"(Only the next {SLOT_FETCH_CHUNK_DAYS} days are listed, the following weeks are "
+                "still loading. Call list_available_slots again with the same range to see them.)"
             )
-            self._slots_map[slot.unique_hash] = slot
 
         return "\n".join(lines) or "No slots available at the moment."
 
+    @function_tool
+    async def list_available_slots_on_day(self, ctx: RunContext[Userdata], day: str) -> str:
+        """
+        Return every available slot of a single day, one per line, in the same format as
+        list_available_slots. Use it to get the exact times of a day from a summarised listing.
+
+        Args:
+            day: The day to look at, as YYYY-MM-DD.
+        """
+        try:
+            date = datetime.date.fromisoformat(day)
+        except ValueError:
+            raise ToolError(f"Invalid day {day!r}, expected YYYY-MM-DD") from None
+
+        now = datetime.datetime.now(self.tz)
+        day_start = datetime.datetime.combine(date, datetime.time(0, 0), tzinfo=self.tz)
+        day_end = datetime.datetime.combine(
+            date + datetime.timedelta(days=1), datetime.time(0, 0), tzinfo=self.tz
+        )
+        if day_end <= now:
+            return "This day is in the past."
+
+        try:
+            slots = await self.window.list(start_time=max(day_start, now), end_time=day_end)
+        except CalendarUnavailableError:
+            raise ToolError(
+                "The calendar can't be reached right now. This does not mean there is no "
+                "availability; apologize and offer to check again in a moment."
+            ) from None
+
+        slots = await self._without_held_slots(slots, day_start, day_end)
+        formatter = SlotFormatter(tz=self.tz, now=now, language=self.language)
+        lines = []
+        for slot in slots:
+            lines.append(formatter.slot_line(slot))
+            self._slots.add(slot)
+
+        return "\n".join(lines) or "No slots available on this day."
+
 
 import base64
 from livekit.agents.telemetry import set_tracer_provider
@@ -244,26 +663,148 @@ def setup_langfuse(
     set_tracer_provider(trace_provider)
 
 
+# how long a prewarmed cal.com identity is trusted before a job refreshes it in the background
+CALCOM_IDENTITY_MAX_AGE_S = 15 * 60
+CALCOM_IDENTITY_PREWARM_TIMEOUT_S = 5.0
+
+
+def prewarm(proc: JobProcess) -> None:
+    """Load the VAD and resolve the cal.com identity once per worker process, before any job."""
+    timings: dict[str, float] = {}
+
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    timings["vad"] = time.perf_counter() - started
+
+    # identities per cal.com API key (by the name of its variable), other tenants' are added by their first job
+    proc.userdata["calcom_identities"] = {}
+    default = Tenant.from_env()
+    cal_api_key = default.cal_api_key
+    if cal_api_key:
+        started = time.perf_counter()
+        if identity := _prewarm_calcom_identity(cal_api_key):
+            proc.userdata["calcom_identities"][default.cal_api_key_env] = identity
+            timings["calcom_identity"] = time.perf_counter() - started
+
+        # availability saved by earlier workers, served while the first fetches refresh it
+        started = time.perf_counter()
+        try:
+            snapshot = SlotSnapshot()
+            loaded = snapshot.load_into(shared_slot_cache())
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Could not load the availability snapshot: {e}")
+        else:
+            proc.userdata["slot_snapshot"] = snapshot
+            if loaded:
+                timings["slot_snapshot"] = time.perf_counter() - started
+
+    proc.userdata["prewarm_timings"] = timings
+    logger.info(
+        "🔥 Worker process prewarmed: "
+        + ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in timings.items())
+    )
+
+
+def _prewarm_calcom_identity(cal_api_key: str) -> CalComIdentity | None:
+    try:
+        identity = asyncio.run(
+            asyncio.wait_for(
+                fetch_calcom_identity(api_key=cal_api_key),
+                timeout=CALCOM_IDENTITY_PREWARM_TIMEOUT_S,
+            )
+        )
+    except Exception as e:
+        # entrypoint falls back to resolving it on the job's critical path
+        logger.warning(f"⚠️  Could not prewarm cal.com identity: {type(e).__name__}: {e}")
+        return None
+
+    logger.info(f"🔥 Prewarmed cal.com identity: {identity}")
+    return identity
+
+
+async def _refresh_calcom_identity(proc: JobProcess, tenant: Tenant, cal: CalComCalendar) -> None:
+    try:
+        identity = await cal.resolve_identity()
+    except Exception as e:
+        logger.warning(f"⚠️  Background cal.com identity refresh failed: {type(e).__name__}: {e}")
+        return
+
+    proc.userdata.setdefault("calcom_identities", {})[tenant.cal_api_key_env] = identity
+    cal.set_identity(identity)
+
+
+def _apply_calcom_invalidation(data: bytes, agent: FrontDeskAgent, snapshot: SlotSnapshot | None) -> None:
+    try:
+        event_type_id, days = decode_invalidation(data)
+    except ValueError as e:
+        logger.warning(f"⚠️  Ignoring cal.com invalidation: {e}")
+        return
+
+    cache = shared_slot_cache()
+    for day in days:
+        cache.invalidate_day(event_type_id, day)
+    agent.invalidate_availability()
+    if snapshot is not None:
+        task = asyncio.create_task(asyncio.to_thread(snapshot.drop_days, event_type_id, days))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    logger.info(f"🔄 cal.com availability changed on {', '.join(day.isoformat() for day in days)}")
+
+
+_background_tasks: set[asyncio.Task[None]] = set()
+
+
 async def entrypoint(ctx: JobContext):
     setup_langfuse()
     await ctx.connect()
 
-    timezone = "utc"
+    # deliver confirmations left in the outbox by earlier jobs
+    sms_manager.open_job()
+
+    # the salon that was called, twilio_server puts its config in the job metadata
+    tenant = tenant_from_metadata(ctx.job.metadata)
+    timezone = tenant.timezone
+    logger.info(f"🏢 Tenant: {tenant.name or tenant.id} ({timezone}, {tenant.language})")
     
     # Debug: Vérifier les variables d'environnement
-    cal_api_key = os.getenv("CAL_API_KEY", None)
+    cal_api_key = tenant.cal_api_key
     logger.info("🔍 Checking calendar configuration...")
-    logger.info(f"🔑 CAL_API_KEY present: {bool(cal_api_key)}")
+    logger.info(f"🔑 {tenant.cal_api_key_env} present: {bool(cal_api_key)}")
     if cal_api_key:
-        logger.info(f"🔑 CAL_API_KEY prefix: {cal_api_key[:10]}...")
+        logger.info(f"🔑 {tenant.cal_api_key_env} prefix: {cal_api_key[:10]}...")
     
+    identities: dict[str, CalComIdentity] = ctx.proc.userdata.setdefault("calcom_identities", {})
     if cal_api_key:
-        logger.info("✅ CAL_API_KEY detected, using Cal.com calendar")
-        cal = CalComCalendar(api_key=cal_api_key, timezone=timezone)
+        logger.info(f"✅ {tenant.cal_api_key_env} detected, using Cal.com calendar")
+        identity: CalComIdentity | None = identities.get(tenant.cal_api_key_env)
+        cal = CalComCalendar(api_key=cal_api_key, timezone=timezone, identity=identity)
         logger.info("📅 CalComCalendar instance created")
+        # the pooled cal.com connections stay open for the next job, only their latency is logged
+        calcom_client = shared_calcom_client()
+
+        async def log_calcom_latency() -> None:
+            calcom_client.log_latency()
+
+        ctx.add_shutdown_callback(log_calcom_latency)
+
+        snapshot: SlotSnapshot | None = ctx.proc.userdata.get("slot_snapshot")
+        if snapshot is not None:
+            snapshot_task = asyncio.create_task(snapshot.run(shared_slot_cache()))
+
+            async def stop_snapshots() -> None:
+                snapshot_task.cancel()
+                await asyncio.gather(snapshot_task, return_exceptions=True)
+
+            ctx.add_shutdown_callback(stop_snapshots)
+
+        if identity is not None and identity.is_stale(CALCOM_IDENTITY_MAX_AGE_S):
+            # keep serving the prewarmed identity, the refresh only matters for later jobs
+            refresh_task = asyncio.create_task(_refresh_calcom_identity(ctx.proc, tenant, cal))
+            ctx.proc.userdata["calcom_identity_refresh"] = refresh_task
     else:
         logger.warning(
-            "⚠️  CAL_API_KEY is not set. Falling back to FakeCalendar; set CAL_API_KEY to enable Cal.com integration."
+            f"⚠️  {tenant.cal_api_key_env} is not set. Falling back to FakeCalendar; set it to enable Cal.com integration."
         )
         cal = FakeCalendar(timezone=timezone)
         logger.info("🎭 FakeCalendar instance created")
@@ -272,6 +813,9 @@ async def entrypoint(ctx: JobContext):
     try:
         await cal.initialize()
         logger.info("✅ Calendar initialization completed successfully")
+        if isinstance(cal, CalComCalendar) and cal.identity is not None:
+            # later jobs of this process for the same account skip the resolution
+            identities.setdefault(tenant.cal_api_key_env, cal.identity)
     except Exception as e:
         logger.error(f"💥 Calendar initialization failed: {type(e).__name__}: {e}")
         logger.error("🎭 Falling back to FakeCalendar due to initialization error")
@@ -279,19 +823,46 @@ async def entrypoint(ctx: JobContext):
         await cal.initialize()
         logger.info("✅ FakeCalendar fallback initialized")
 
+    services: CalendarRegistry | None = None
+    if isinstance(cal, CalComCalendar):
+        try:
+            if tenant.services and (services_config := load_services_config(tenant.services)) is not None:
+                services = CalendarRegistry.from_calcom(cal, services_config)
+                logger.info(f"💇 Services: {'; '.join(services.describe())}")
+        except ValueError as e:
+            logger.error(f"💥 Invalid services of {tenant.id}, booking the default event type only: {e}")
+
+    # the VAD comes from prewarm; the turn detector binds to this job's inference executor,
+    # so it is built here, its model weights are already loaded in the shared inference process
+    vad = ctx.proc.userdata.get("vad") or silero.VAD.load()
+    started = time.perf_counter()
+    turn_detection = MultilingualModel()
+    turn_detection_elapsed = time.perf_counter() - started
+
+    prewarm_timings: dict[str, float] = ctx.proc.userdata.get("prewarm_timings", {})
+    logger.info(
+        f"⏱️  Session models ready in {turn_detection_elapsed * 1000:.0f}ms, "
+        f"saved {sum(prewarm_timings.values()) * 1000:.0f}ms thanks to prewarm "
+        f"({', '.join(prewarm_timings) or 'nothing prewarmed'})"
+    )
+
+    # slots selected during this call are held until booked, for SLOT_HOLD_TTL_S or until hangup
+    holds = SlotHolds(holder=ctx.room.name)
+    ctx.add_shutdown_callback(holds.release_all)
+
     session = AgentSession[Userdata](
-        userdata=Userdata(cal=cal),
+        userdata=Userdata(cal=cal, services=services, holds=holds),
         preemptive_generation=True,
         stt=deepgram.STT(
-            language="fr",
+            language=tenant.language,
             endpointing_ms=1200,  # Augmenté de 500 à 1200ms pour les emails
             punctuate=True,
             smart_format=True
         ),
         llm=openai.LLM(model="gpt-4o-mini", parallel_tool_calls=False, temperature=0.45),
-                tts=elevenlabs.TTS(model="eleven_flash_v2_5"),
-        turn_detection=MultilingualModel(),
-        vad=silero.VAD.load(),
+        tts=elevenlabs.TTS(model="eleven_flash_v2_5", language=tenant.language),
+        turn_detection=turn_detection,
+        vad=vad,
         max_tool_steps=1,
     )
 
@@ -314,8 +885,39 @@ async def entrypoint(ctx: JobContext):
     ctx.add_shutdown_callback(log_usage)
 
 
-    await session.start(agent=FrontDeskAgent(timezone=timezone), room=ctx.room)
+    agent = FrontDeskAgent(
+        timezone=timezone,
+        language=tenant.language,
+        several_services=services is not None,
+        salon_name=tenant.name,
+        greeting=tenant.greeting,
+        extra_instructions=tenant.instructions,
+    )
+
+    async def drain_sms() -> None:
+        # only this call's confirmations, the outbox keeps serving the other jobs
+        await sms_manager.drain(agent.sms_keys)
+
+    ctx.add_shutdown_callback(drain_sms)
+
+    # bookings made outside of this call, pushed by the cal.com webhook of twilio_server through
+    # the server API: a packet sent by a participant (e.g. the caller) is not trusted
+    @ctx.room.on("data_received")
+    def on_data_received(packet: rtc.DataPacket) -> None:
+        if packet.topic == CALCOM_INVALIDATE_TOPIC and packet.participant is None:
+            _apply_calcom_invalidation(packet.data, agent, ctx.proc.userdata.get("slot_snapshot"))
+
+    await session.start(agent=agent, room=ctx.room)
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, agent_name="frontdesk_agent"))
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            agent_name="frontdesk_agent",
+            # a full worker stops taking calls instead of degrading the ones it runs
+            load_fnc=WorkerLoad(),
+            load_threshold=FRONTDESK_LOAD_THRESHOLD,
+        )
+    )
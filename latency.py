@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import bisect
+import math
+
+# upper bounds of the histogram buckets, in milliseconds
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap enough to record every request."""
+
+    def __init__(self, buckets_ms: tuple[float, ...] = DEFAULT_BUCKETS_MS) -> None:
+        self._bounds = buckets_ms
+        self._counts = [0] * (len(buckets_ms) + 1)  # the last bucket is +inf
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def observe(self, elapsed_s: float) -> None:
+        self._counts[bisect.bisect_left(self._bounds, elapsed_s * 1000)] += 1
+        self.count += 1
+        self.total_s += elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound (in ms) of the bucket holding the p-th percentile, inf if beyond the buckets."""
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bound, n in zip((*self._bounds, math.inf), self._counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def summary(self) -> str:
+        if not self.count:
+            return "n=0"
+        return (
+            f"n={self.count} avg={_ms(self.total_s / self.count * 1000)}ms "
+            f"p50<={_ms(self.percentile(50))}ms p95<={_ms(self.percentile(95))}ms "
+            f"max={_ms(self.max_s * 1000)}ms"
+        )
+
+
+def _ms(value: float) -> str:
+    # sub-millisecond histograms (e.g. token minting) keep two significant digits
+    return f"{value:.0f}" if value >= 10 else f"{value:.2g}"
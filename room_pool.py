@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import logging
+import os
+import time
+import uuid
+
+from livekit.api import CreateRoomRequest, DeleteRoomRequest, LiveKitAPI
+
+# empty rooms kept ready so an incoming call doesn't wait for create_room
+ROOM_POOL_SIZE = int(os.getenv("ROOM_POOL_SIZE", "4"))
+# LiveKit deletes a room nobody joined after this long, the pool replaces it a bit before
+ROOM_POOL_EMPTY_TIMEOUT_S = int(os.getenv("ROOM_POOL_EMPTY_TIMEOUT_S", "600"))
+ROOM_POOL_EXPIRY_MARGIN_S = 30.0
+ROOM_POOL_RETRY_DELAY_S = 5.0
+
+logger = logging.getLogger("room-pool")
+
+
+class RoomPool:
+    """
+    Pre-created, empty LiveKit rooms handed out to incoming calls.
+
+    A background task keeps `size` rooms ready and replaces those about to hit their empty
+    timeout. `pop()` never waits on LiveKit: it returns None when the pool is drained, and
+    the caller creates a room itself.
+    """
+
+    def __init__(
+        self,
+        api: LiveKitAPI,
+        *,
+        size: int = ROOM_POOL_SIZE,
+        empty_timeout: int = ROOM_POOL_EMPTY_TIMEOUT_S,
+    ) -> None:
+        self._api = api
+        self._size = size
+        self._empty_timeout = empty_timeout
+        # (room name, created at), oldest first
+        self._rooms: collections.deque[tuple[str, float]] = collections.deque()
+        self._wanted = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def start(self) -> None:
+        if self._task is None and self._size > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop refilling and delete the rooms nobody used."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        rooms, self._rooms = self._rooms, collections.deque()
+        await asyncio.gather(
+            *(self._api.room.delete_room(DeleteRoomRequest(room=name)) for name, _ in rooms),
+            return_exceptions=True,
+        )
+
+    def pop(self) -> str | None:
+        """The name of a ready room, or None if there is none left."""
+        self._drop_expiring()
+        self._wanted.set()
+        if not self._rooms:
+            return None
+        name, _ = self._rooms.popleft()
+        return name
+
+    def _drop_expiring(self) -> None:
+        deadline = time.monotonic() - (self._empty_timeout - ROOM_POOL_EXPIRY_MARGIN_S)
+        while self._rooms and self._rooms[0][1] <= deadline:
+            self._rooms.popleft()  # LiveKit deletes it on its own
+
+    async def _run(self) -> None:
+        while True:
+            self._drop_expiring()
+            missing = self._size - len(self._rooms)
+            if missing > 0:
+                try:
+                    await self._create(missing)
+                except Exception as e:
+                    logger.warning(f"⚠️  Could not refill the room pool: {type(e).__name__}: {e}")
+                    await asyncio.sleep(ROOM_POOL_RETRY_DELAY_S)
+                    continue
+
+            # woken up by pop(), or when the oldest room is about to expire
+            self._wanted.clear()
+            next_expiry = (
+                self._rooms[0][1] + self._empty_timeout - ROOM_POOL_EXPIRY_MARGIN_S - time.monotonic()
+                if self._rooms
+                else None
+            )
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wanted.wait(), next_expiry)
+
+    async def _create(self, count: int) -> None:
+        names = [str(uuid.uuid4()) for _ in range(count)]
+        created_at = time.monotonic()
+        results = await asyncio.gather(
+            *(
+                self._api.room.create_room(
+                    CreateRoomRequest(name=name, empty_timeout=self._empty_timeout)
+                )
+                for name in names
+            ),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        self._rooms.extend(
+            (name, created_at) for name, result in zip(names, results) if not isinstance(result, BaseException)
+        )
+        if errors:
+            raise errors[0]
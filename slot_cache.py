@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import os
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from calendar_api import SlotBatch
+
+SLOT_CACHE_TTL_S = float(os.getenv("CAL_SLOT_CACHE_TTL", "60"))
+# a day seeded from a snapshot is served stale while revalidating up to this age, then it is a
+# miss: a revalidation that keeps failing must not keep old availability alive forever
+SLOT_STALE_MAX_AGE_S = 6 * 3600.0
+# long windows are fetched as concurrent chunks of at most this many days
+SLOT_FETCH_CHUNK_DAYS = 7
+
+SlotFetcher = Callable[[datetime.datetime, datetime.datetime], Awaitable["SlotBatch"]]
+
+
+@dataclass
+class _DayEntry:
+    slots: SlotBatch
+    fetched_at: float
+    from_snapshot: bool = False
+
+
+class SlotCache:
+    """
+    Availability cache keyed by calendar key (e.g. the cal.com event type id) and UTC day.
+
+    Misses are fetched as contiguous runs of whole days, split into chunks of `chunk_days`
+    fetched concurrently, and concurrent misses on the same day share a single in-flight
+    fetch instead of issuing their own request.
+
+    Days seeded from an availability snapshot are served stale-while-revalidate: once expired
+    they are still answered right away while a background fetch refreshes them, until they are
+    `stale_max_age` seconds old.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = SLOT_CACHE_TTL_S,
+        chunk_days: int = SLOT_FETCH_CHUNK_DAYS,
+        stale_max_age: float = SLOT_STALE_MAX_AGE_S,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_max_age = stale_max_age
+        self.chunk_days = chunk_days
+        self._days: dict[tuple[Hashable, datetime.date], _DayEntry] = {}
+        self._generations: dict[tuple[Hashable, datetime.date], int] = {}
+        # days invalidated since the availability snapshot last took them
+        self._invalidated: set[tuple[Hashable, datetime.date]] = set()
+        self._inflight: dict[
+            tuple[asyncio.AbstractEventLoop, Hashable, datetime.date],
+            asyncio.Task[dict[datetime.date, SlotBatch]],
+        ] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        *,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        fetch: SlotFetcher,
+    ) -> SlotBatch:
+        from calendar_api import SlotBatch  # calendar_api imports this module
+
+        start_time = start_time.astimezone(datetime.timezone.utc)
+        end_time = end_time.astimezone(datetime.timezone.utc)
+        if end_time <= start_time:
+            return SlotBatch(duration_min=0)
+
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+
+        days = _day_range(start_time, end_time)
+        resolved: dict[datetime.date, SlotBatch] = {}
+        pending: dict[datetime.date, asyncio.Task[dict[datetime.date, SlotBatch]]] = {}
+        missing: list[datetime.date] = []
+        revalidate: list[datetime.date] = []
+
+        for day in days:
+            entry = self._days.get((key, day))
+            if entry is not None and now - entry.fetched_at < self.ttl:
+                resolved[day] = entry.slots
+            elif entry is not None and entry.from_snapshot and now - entry.fetched_at < self.stale_max_age:
+                resolved[day] = entry.slots
+                if (loop, key, day) not in self._inflight:
+                    revalidate.append(day)
+            elif task := self._inflight.get((loop, key, day)):
+                pending[day] = task
+            else:
+                missing.append(day)
+
+        # not awaited, the snapshot answers until the refreshed days are stored
+        for run in _contiguous_runs(revalidate, max_len=self.chunk_days):
+            self._start_fetch(loop, key, run, fetch)
+
+        for run in _contiguous_runs(missing, max_len=self.chunk_days):
+            task = self._start_fetch(loop, key, run, fetch)
+            for day in run:
+                pending[day] = task
+
+        # shield the shared fetches, a cancelled caller must not cancel the other waiters
+        for task in set(pending.values()):
+            fetched = await asyncio.shield(task)
+            for day, slots in fetched.items():
+                if day in pending:
+                    resolved[day] = slots
+
+        day_batches = [resolved[day] for day in days]
+        return SlotBatch.concat(day_batches, duration_min=day_batches[0].duration_min).range(
+            start_time, end_time
+        )
+
+    def get_stale(
+        self, key: Hashable, *, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> SlotBatch | None:
+        """
+        Return cached slots for the window ignoring the TTL, None unless every day is cached.
+
+        Meant as a fallback while the calendar backend is unavailable; invalidated days and
+        snapshot days past `stale_max_age` are never served.
+        """
+        from calendar_api import SlotBatch  # calendar_api imports this module
+
+        start_time = start_time.astimezone(datetime.timezone.utc)
+        end_time = end_time.astimezone(datetime.timezone.utc)
+        now = time.monotonic()
+        entries = [self._days.get((key, day)) for day in _day_range(start_time, end_time)]
+        if not entries or any(
+            entry is None or (entry.from_snapshot and now - entry.fetched_at >= self.stale_max_age)
+            for entry in entries
+        ):
+            return None
+
+        day_batches = [entry.slots for entry in entries if entry is not None]
+        return SlotBatch.concat(day_batches, duration_min=day_batches[0].duration_min).range(
+            start_time, end_time
+        )
+
+    def seed(self, key: Hashable, day: datetime.date, slots: SlotBatch, *, age: float) -> None:
+        """Load a day from an availability snapshot taken `age` seconds ago, unless already cached."""
+        if (key, day) not in self._days:
+            now = time.monotonic()
+            self._days[(key, day)] = _DayEntry(slots=slots, fetched_at=now - age, from_snapshot=True)
+            self._prune(now)
+
+    def snapshot(self, *, since: datetime.date) -> list[tuple[Hashable, datetime.date, SlotBatch, float]]:
+        """Return (key, day, slots, age in seconds) for every cached day from `since` on."""
+        now = time.monotonic()
+        return [
+            (key, day, entry.slots, now - entry.fetched_at)
+            for (key, day), entry in list(self._days.items())
+            if day >= since
+        ]
+
+    def invalidate_day(self, key: Hashable, day: datetime.date) -> None:
+        """Drop a cached UTC day, results of fetches already in flight for it won't be stored."""
+        self._days.pop((key, day), None)
+        self._generations[(key, day)] = self._generations.get((key, day), 0) + 1
+        self._invalidated.add((key, day))
+
+    def take_invalidated(self) -> set[tuple[Hashable, datetime.date]]:
+        """Return the (key, day) pairs invalidated since the last call, e.g. to drop them from a snapshot."""
+        invalidated, self._invalidated = self._invalidated, set()
+        return invalidated
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        for cache_key in [k for k in self._days if key is None or k[0] == key]:
+            self.invalidate_day(*cache_key)
+
+    def _start_fetch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        key: Hashable,
+        run: list[datetime.date],
+        fetch: SlotFetcher,
+    ) -> asyncio.Task[dict[datetime.date, SlotBatch]]:
+        task = loop.create_task(self._fetch_run(key, run, fetch))
+        task.add_done_callback(lambda t: self._on_fetch_done(loop, key, run, t))
+        for day in run:
+            self._inflight[(loop, key, day)] = task
+        return task
+
+    async def _fetch_run(
+        self,
+        key: Hashable,
+        run: list[datetime.date],
+        fetch: SlotFetcher,
+    ) -> dict[datetime.date, SlotBatch]:
+        generations = {day: self._generations.get((key, day), 0) for day in run}
+        # whole days only, they are stored as such and callers slice them
+        batch = await fetch(_day_start(run[0]), _day_start(run[-1] + datetime.timedelta(days=1)))
+
+        by_day = batch.split_by_day()
+        by_day = {day: by_day.get(day) or batch[0:0] for day in run}
+
+        fetched_at = time.monotonic()
+        for day, day_slots in by_day.items():
+            if self._generations.get((key, day), 0) == generations[day]:
+                self._days[(key, day)] = _DayEntry(slots=day_slots, fetched_at=fetched_at)
+        self._prune(fetched_at)
+
+        return by_day
+
+    def _prune(self, now: float) -> None:
+        # a long-running worker would otherwise keep every day it has ever seen
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        max_age = max(self.ttl, self.stale_max_age)
+        for cache_key in [
+            cache_key
+            for cache_key, entry in self._days.items()
+            if cache_key[1] < today or now - entry.fetched_at >= max_age
+        ]:
+            del self._days[cache_key]
+        for cache_key in [cache_key for cache_key in self._generations if cache_key[1] < today]:
+            del self._generations[cache_key]
+        self._invalidated = {cache_key for cache_key in self._invalidated if cache_key[1] >= today}
+
+    def _on_fetch_done(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        key: Hashable,
+        run: list[datetime.date],
+        task: asyncio.Task[dict[datetime.date, SlotBatch]],
+    ) -> None:
+        for day in run:
+            if self._inflight.get((loop, key, day)) is task:
+                del self._inflight[(loop, key, day)]
+
+        if not task.cancelled():
+            task.exception()  # mark as retrieved, waiters get it from their own await
+
+
+_shared_slot_cache: SlotCache | None = None
+
+
+def shared_slot_cache() -> SlotCache:
+    """Return the process-wide slot cache shared by every calendar of this worker process."""
+    global _shared_slot_cache
+    if _shared_slot_cache is None:
+        _shared_slot_cache = SlotCache()
+    return _shared_slot_cache
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time(0, 0), tzinfo=datetime.timezone.utc)
+
+
+def _day_range(start_time: datetime.datetime, end_time: datetime.datetime) -> list[datetime.date]:
+    last = (end_time - datetime.timedelta(microseconds=1)).date()
+    day = start_time.date()
+    days = []
+    while day <= last:
+        days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _contiguous_runs(days: list[datetime.date], *, max_len: int) -> list[list[datetime.date]]:
+    runs: list[list[datetime.date]] = []
+    for day in days:
+        if runs and runs[-1][-1] + datetime.timedelta(days=1) == day and len(runs[-1]) < max_len:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
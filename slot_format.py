@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import datetime
+import itertools
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from calendar_api import AvailableSlot, Booking
+
+# listings up to this many slots are returned slot by slot, longer ones are summarised per day
+DETAIL_MAX_SLOTS = 12
+# ids shown per part of the day in a summary
+SUMMARY_REPRESENTATIVES = 2
+
+# (part of the day, local hour it ends at)
+PARTS_OF_DAY = (("morning", 12), ("afternoon", 17), ("evening", 24))
+
+
+@dataclass(frozen=True)
+class _Locale:
+    weekdays: tuple[str, ...]
+    months: tuple[str, ...]
+    day_format: str
+    at: str
+    within_the_hour: str
+    later_today: str
+    tomorrow: str
+    in_days: str
+    in_one_week: str
+    in_weeks: str
+    parts_of_day: dict[str, str]
+
+
+LOCALES = {
+    "en": _Locale(
+        weekdays=("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+        months=(
+            "January", "February", "March", "April", "May", "June",
+            "July", "August", "September", "October", "November", "December",
+        ),
+        day_format="{weekday}, {month} {day:02d}, {year}",
+        at="at",
+        within_the_hour="in less than an hour",
+        later_today="later today",
+        tomorrow="tomorrow",
+        in_days="in {n} days",
+        in_one_week="in 1 week",
+        in_weeks="in {n} weeks",
+        parts_of_day={"morning": "morning", "afternoon": "afternoon", "evening": "evening"},
+    ),
+    "fr": _Locale(
+        weekdays=("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"),
+        months=(
+            "janvier", "février", "mars", "avril", "mai", "juin",
+            "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+        ),
+        day_format="{weekday} {day} {month} {year}",
+        at="à",
+        within_the_hour="dans moins d'une heure",
+        later_today="plus tard aujourd'hui",
+        tomorrow="demain",
+        in_days="dans {n} jours",
+        in_one_week="dans 1 semaine",
+        in_weeks="dans {n} semaines",
+        parts_of_day={"morning": "matin", "afternoon": "après-midi", "evening": "soir"},
+    ),
+    "de": _Locale(
+        weekdays=("Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"),
+        months=(
+            "Januar", "Februar", "März", "April", "Mai", "Juni",
+            "Juli", "August", "September", "Oktober", "November", "Dezember",
+        ),
+        day_format="{weekday}, {day:02d}. {month} {year}",
+        at="um",
+        within_the_hour="in weniger als einer Stunde",
+        later_today="später heute",
+        tomorrow="morgen",
+        in_days="in {n} Tagen",
+        in_one_week="in 1 Woche",
+        in_weeks="in {n} Wochen",
+        parts_of_day={"morning": "Vormittag", "afternoon": "Nachmittag", "evening": "Abend"},
+    ),
+}
+
+
+@dataclass(frozen=True)
+class _Day:
+    label: str
+    relative: str
+    tzname: str | None  # None when the offset changes during the day (DST switch)
+
+
+class SlotFormatter:
+    """
+    Formats the slots of one listing relative to `now`, in `language` (en, fr or de).
+
+    Day labels, relative phrases and time zone names are computed once per local day and
+    reused for every slot of that day.
+    """
+
+    def __init__(self, *, tz: datetime.tzinfo, now: datetime.datetime, language: str = "en") -> None:
+        self._tz = tz
+        self._now = now.astimezone(tz)
+        self._locale = LOCALES.get(language, LOCALES["en"])
+        self._days: dict[datetime.date, _Day] = {}
+
+    def slot_line(self, slot: AvailableSlot) -> str:
+        """<slot_id> – <day label> <at> <HH:MM> <TZ> (<relative time>)"""
+        return f"{slot.unique_hash} – {self._when(slot.start_time)}"
+
+    def booking_line(self, booking: Booking) -> str:
+        """<booking_id> – <day label> <at> <HH:MM> <TZ> (<relative time>) – <attendee name>"""
+        return f"{booking.uid} – {self._when(booking.start_time)} – {booking.attendee_name}"
+
+    def appointment(self, start_time: datetime.datetime) -> str:
+        """<day label> <at> <HH:MM> <TZ>, e.g. for a booking confirmation"""
+        local = start_time.astimezone(self._tz)
+        day = self._day(local.date())
+        return f"{day.label} {self._locale.at} {local.hour:02d}:{local.minute:02d} {day.tzname or local.tzname()}"
+
+    def _when(self, start_time: datetime.datetime) -> str:
+        local = start_time.astimezone(self._tz)
+        return f"{self.appointment(start_time)} ({self._relative(local, self._day(local.date()))})"
+
+    def summarize_by_day(
+        self, slots: Iterable[AvailableSlot], *, representatives: int = SUMMARY_REPRESENTATIVES
+    ) -> tuple[list[str], list[AvailableSlot]]:
+        """
+        One line per local day with the number of slots per part of the day and a few of their ids:
+
+            <day label> (<relative time>): <part of day> 3 (<slot_id> 09:00, <slot_id> 10:30), ...
+
+        Returns the lines and the slots whose ids were shown.
+        """
+        lines: list[str] = []
+        shown: list[AvailableSlot] = []
+
+        local_slots = ((slot, slot.start_time.astimezone(self._tz)) for slot in slots)
+        for date, day_slots in itertools.groupby(local_slots, key=lambda item: item[1].date()):
+            day_slots = list(day_slots)
+            day = self._day(date)
+
+            parts: list[str] = []
+            for part, part_slots in itertools.groupby(day_slots, key=lambda item: _part_of_day(item[1])):
+                part_slots = list(part_slots)
+                picks = part_slots[:representatives]
+                shown.extend(slot for slot, _ in picks)
+                ids = ", ".join(
+                    f"{slot.unique_hash} {local.hour:02d}:{local.minute:02d}" for slot, local in picks
+                )
+                parts.append(f"{self._locale.parts_of_day[part]} {len(part_slots)} ({ids})")
+
+            lines.append(f"{day.label} ({self._relative(day_slots[0][1], day)}): " + ", ".join(parts))
+
+        return lines, shown
+
+    def _day(self, date: datetime.date) -> _Day:
+        if (day := self._days.get(date)) is not None:
+            return day
+
+        locale = self._locale
+        label = locale.day_format.format(
+            weekday=locale.weekdays[date.weekday()],
+            day=date.day,
+            month=locale.months[date.month - 1],
+            year=date.year,
+        )
+
+        days = (date - self._now.date()).days
+        if days == 0:
+            relative = ""  # depends on the time, see _relative
+        elif days == 1:
+            relative = locale.tomorrow
+        elif days < 7:
+            relative = locale.in_days.format(n=days)
+        elif days < 14:
+            relative = locale.in_one_week
+        else:
+            relative = locale.in_weeks.format(n=days // 7)
+
+        first = datetime.datetime.combine(date, datetime.time(0, 0), tzinfo=self._tz)
+        last = datetime.datetime.combine(date, datetime.time(23, 59), tzinfo=self._tz)
+        tzname = first.tzname() if first.utcoffset() == last.utcoffset() else None
+
+        day = self._days[date] = _Day(label=label, relative=relative, tzname=tzname)
+        return day
+
+    def _relative(self, local: datetime.datetime, day: _Day) -> str:
+        if day.relative:
+            return day.relative
+        if local - self._now < datetime.timedelta(hours=1):
+            return self._locale.within_the_hour
+        return self._locale.later_today
+
+
+def _part_of_day(local: datetime.datetime) -> str:
+    for name, end_hour in PARTS_OF_DAY:
+        if local.hour < end_hour:
+            return name
+    return PARTS_OF_DAY[-1][0]
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Iterator, Sequence
+
+# shared by every worker process on the host; unset SLOT_HOLDS_PATH keeps holds in-process
+SLOT_HOLDS_PATH = os.getenv("SLOT_HOLDS_PATH", "slot_holds.sqlite3") or None
+# a selected slot stays reserved this long unless it is booked or the call ends first
+SLOT_HOLD_TTL_S = float(os.getenv("SLOT_HOLD_TTL_S", "180"))
+
+logger = logging.getLogger("slot-holds")
+
+# (calendar key, start epoch seconds) -> (holder, expires_at), for holds without a file
+_memory_holds: dict[tuple[str, int], tuple[str, float]] = {}
+
+
+class SlotHolds:
+    """
+    Short-lived reservations of the slots a caller selected, so concurrent calls stop offering
+    them and don't race for the same booking.
+
+    Holds expire after `ttl` seconds and are released when the slot is booked or the call ends.
+    A slot bookable with several staff members is held on one of their calendars, and only
+    hidden from other callers once every one of them is held.
+    They are shared through a SQLite file between the worker processes of a host, or kept in
+    this process when `path` is None. Holds are advisory: if the file can't be used, every
+    slot is reported free and the booking request has the final say.
+    """
+
+    def __init__(self, holder: str, *, path: str | None = SLOT_HOLDS_PATH, ttl: float = SLOT_HOLD_TTL_S) -> None:
+        self.holder = holder
+        self._path = path
+        self._ttl = ttl
+
+        if path is not None:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS slot_holds (
+                        calendar_key TEXT NOT NULL,
+                        start_ts INTEGER NOT NULL,
+                        holder TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (calendar_key, start_ts)
+                    )
+                    """
+                )
+
+    async def hold(self, calendar_keys: str | Sequence[str], start_time: datetime.datetime) -> bool:
+        """
+        Reserve a slot on one of `calendar_keys` (or extend our hold on it), False if other
+        callers hold it on all of them.
+        """
+        start_ts = int(start_time.timestamp())
+        keys = _keys(calendar_keys)
+        if self._path is None:
+            now = time.time()
+            for key in [key for key, (_, expires_at) in _memory_holds.items() if expires_at <= now]:
+                del _memory_holds[key]
+            ours = {key for key in keys if _memory_holds.get((key, start_ts), ("",))[0] == self.holder}
+            # extend the hold we already have rather than taking a second staff member
+            for calendar_key in sorted(keys, key=lambda key: key not in ours):
+                current = _memory_holds.get((calendar_key, start_ts))
+                if current is None or calendar_key in ours:
+                    _memory_holds[(calendar_key, start_ts)] = (self.holder, now + self._ttl)
+                    return True
+            return False
+        try:
+            return await asyncio.to_thread(self._hold, keys, start_ts)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Could not hold slot: {e}")
+            return True
+
+    async def held_by_others(
+        self, calendar_keys: str | Sequence[str], start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> set[datetime.datetime]:
+        """Start times in [start_time, end_time) other callers hold on every one of `calendar_keys`."""
+        lo, hi = int(start_time.timestamp()), int(end_time.timestamp())
+        keys = _keys(calendar_keys)
+        if self._path is None:
+            now = time.time()
+            per_key = [
+                {
+                    start_ts
+                    for (key, start_ts), (holder, expires_at) in _memory_holds.items()
+                    if key == calendar_key and lo <= start_ts < hi and holder != self.holder and expires_at > now
+                }
+                for calendar_key in keys
+            ]
+        else:
+            try:
+                per_key = await asyncio.to_thread(self._held_by_others, keys, lo, hi)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Could not read slot holds: {e}")
+                return set()
+        starts = set.intersection(*per_key) if per_key else set()
+        return {datetime.datetime.fromtimestamp(start_ts, datetime.timezone.utc) for start_ts in starts}
+
+    async def release(self, calendar_keys: str | Sequence[str], start_time: datetime.datetime) -> None:
+        start_ts = int(start_time.timestamp())
+        keys = _keys(calendar_keys)
+        if self._path is None:
+            for calendar_key in keys:
+                if _memory_holds.get((calendar_key, start_ts), ("",))[0] == self.holder:
+                    del _memory_holds[(calendar_key, start_ts)]
+            return
+        with contextlib.suppress(sqlite3.Error):  # the hold expires on its own
+            await asyncio.to_thread(self._release, keys, start_ts)
+
+    async def release_all(self) -> None:
+        """Release every hold of this caller, e.g. on hangup."""
+        if self._path is None:
+            for key in [k for k, (holder, _) in _memory_holds.items() if holder == self.holder]:
+                del _memory_holds[key]
+            return
+        with contextlib.suppress(sqlite3.Error):
+            await asyncio.to_thread(self._release_all)
+
+    # --- storage, runs in worker threads ---
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        assert self._path is not None
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _hold(self, calendar_keys: list[str], start_ts: int) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            ours = {
+                calendar_key
+                for (calendar_key,) in conn.execute(
+                    "SELECT calendar_key FROM slot_holds WHERE start_ts = ? AND holder = ?",
+                    (start_ts, self.holder),
+                )
+            }
+            # extend the hold we already have rather than taking a second staff member
+            for calendar_key in sorted(calendar_keys, key=lambda key: key not in ours):
+                # a single statement, so two workers can't both take the same slot
+                cursor = conn.execute(
+                    """
+                    INSERT INTO slot_holds (calendar_key, start_ts, holder, expires_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (calendar_key, start_ts) DO UPDATE SET
+                        holder = excluded.holder,
+                        expires_at = excluded.expires_at
+                    WHERE slot_holds.holder = excluded.holder OR slot_holds.expires_at <= ?
+                    """,
+                    (calendar_key, start_ts, self.holder, now + self._ttl, now),
+                )
+                if cursor.rowcount == 1:
+                    return True
+        return False
+
+    def _held_by_others(self, calendar_keys: list[str], lo: int, hi: int) -> list[set[int]]:
+        now = time.time()
+        with self._connect() as conn:
+            return [
+                {
+                    start_ts
+                    for (start_ts,) in conn.execute(
+                        """
+                        SELECT start_ts FROM slot_holds
+                        WHERE calendar_key = ? AND start_ts >= ? AND start_ts < ?
+                            AND holder != ? AND expires_at > ?
+                        """,
+                        (calendar_key, lo, hi, self.holder, now),
+                    )
+                }
+                for calendar_key in calendar_keys
+            ]
+
+    def _release(self, calendar_keys: list[str], start_ts: int) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM slot_holds WHERE calendar_key = ? AND start_ts = ? AND holder = ?",
+                [(calendar_key, start_ts, self.holder) for calendar_key in calendar_keys],
+            )
+
+    def _release_all(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM slot_holds WHERE holder = ? OR expires_at <= ?",
+                (self.holder, time.time()),
+            )
+
+
+def _keys(calendar_keys: str | Sequence[str]) -> list[str]:
+    return [calendar_keys] if isinstance(calendar_keys, str) else list(calendar_keys)
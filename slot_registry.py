@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import datetime
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from slot_cache import SLOT_CACHE_TTL_S
+
+if TYPE_CHECKING:
+    from calendar_api import AvailableSlot
+
+SLOT_REGISTRY_MAX_SIZE = 512
+
+
+@dataclass
+class _Entry:
+    slot: AvailableSlot
+    listed_at: float
+
+
+class SlotRegistry:
+    """
+    Per-session map from the slot ids handed to the LLM back to their slots.
+
+    The registry is bounded (least recently used ids are evicted first) and an id is only
+    trusted for `ttl` seconds after it was last listed, the lifetime of the cached availability
+    it came from. Booked slots are discarded so their ids can't be resolved anymore.
+    """
+
+    def __init__(self, *, max_size: int = SLOT_REGISTRY_MAX_SIZE, ttl: float = SLOT_CACHE_TTL_S) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._by_id: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_start: dict[datetime.datetime, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, slot: AvailableSlot) -> None:
+        self._by_id[slot.unique_hash] = _Entry(slot=slot, listed_at=time.monotonic())
+        self._by_id.move_to_end(slot.unique_hash)
+        self._by_start[slot.start_time] = slot.unique_hash
+
+        while len(self._by_id) > self._max_size:
+            _, evicted = self._by_id.popitem(last=False)
+            self._forget_start(evicted.slot)
+
+    def get(self, slot_id: str) -> AvailableSlot | None:
+        """Return the slot for an id, None if it is unknown, evicted or already booked."""
+        if (entry := self._by_id.get(slot_id)) is None:
+            return None
+        self._by_id.move_to_end(slot_id)
+        return entry.slot
+
+    def is_fresh(self, slot_id: str) -> bool:
+        entry = self._by_id.get(slot_id)
+        return entry is not None and time.monotonic() - entry.listed_at < self._ttl
+
+    def find_by_start(self, start_time: datetime.datetime) -> AvailableSlot | None:
+        if (slot_id := self._by_start.get(start_time)) is None:
+            return None
+        return self.get(slot_id)
+
+    def discard(self, start_time: datetime.datetime) -> None:
+        """Forget the slot starting at `start_time`, e.g. once it has been booked."""
+        if (slot_id := self._by_start.pop(start_time, None)) is not None:
+            self._by_id.pop(slot_id, None)
+
+    def _forget_start(self, slot: AvailableSlot) -> None:
+        if self._by_start.get(slot.start_time) == slot.unique_hash:
+            del self._by_start[slot.start_time]
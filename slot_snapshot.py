@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Hashable, Iterable, Iterator
+
+from slot_cache import SLOT_STALE_MAX_AGE_S, SlotCache
+
+SLOT_SNAPSHOT_PATH = os.getenv("CAL_SLOT_SNAPSHOT_PATH", "slot_snapshot.sqlite3")
+# days ahead written to the snapshot
+SLOT_SNAPSHOT_DAYS = 31
+SLOT_SNAPSHOT_INTERVAL_S = 300.0
+# an older snapshot is not worth serving, even as stale data
+SLOT_SNAPSHOT_MAX_AGE_S = SLOT_STALE_MAX_AGE_S
+
+logger = logging.getLogger("slot-snapshot")
+
+
+class SlotSnapshot:
+    """
+    Availability snapshot persisted to SQLite, so a restarted worker has warm slots right away.
+
+    Each row holds one cached UTC day, its start times packed as an array of epoch seconds.
+    Several worker processes may share the same file, the newest write of a day wins.
+    """
+
+    def __init__(
+        self,
+        path: str = SLOT_SNAPSHOT_PATH,
+        *,
+        days: int = SLOT_SNAPSHOT_DAYS,
+        max_age: float = SLOT_SNAPSHOT_MAX_AGE_S,
+    ) -> None:
+        self._path = path
+        self._days = days
+        self._max_age = max_age
+        # days invalidated in the cache whose rows are not deleted yet
+        self._dropped: set[tuple[Hashable, datetime.date]] = set()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS slot_snapshot (
+                    cache_key NOT NULL,
+                    day TEXT NOT NULL,
+                    duration_min INTEGER NOT NULL,
+                    starts BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (cache_key, day)
+                )
+                """
+            )
+
+    def load_into(self, cache: SlotCache) -> int:
+        """Seed `cache` with the snapshot, returns the number of days loaded."""
+        from calendar_api import SlotBatch  # calendar_api imports slot_cache
+
+        now = time.time()
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT cache_key, day, duration_min, starts, fetched_at FROM slot_snapshot "
+                "WHERE day >= ? AND fetched_at >= ?",
+                (today.isoformat(), now - self._max_age),
+            ).fetchall()
+
+        for key, day, duration_min, blob, fetched_at in rows:
+            cache.seed(
+                key,
+                datetime.date.fromisoformat(day),
+                SlotBatch.from_bytes(blob, duration_min=duration_min),
+                age=max(0.0, now - fetched_at),
+            )
+        return len(rows)
+
+    def save(self, cache: SlotCache) -> int:
+        """
+        Write the cached days of the next `days` days, returns the number of days written.
+
+        Days invalidated in the cache since the last save are deleted first, a restarted worker
+        must not load the availability they had before e.g. a booking.
+        """
+        rows, dropped = self._rows(cache), self._take_dropped(cache)
+        self._write(rows, dropped)
+        self._dropped -= dropped
+        return len(rows)
+
+    def drop_days(self, key: Hashable, days: Iterable[datetime.date]) -> None:
+        """Forget days whose availability changed, so they are never loaded again."""
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM slot_snapshot WHERE cache_key = ? AND day = ?",
+                [(key, day.isoformat()) for day in days],
+            )
+
+    async def run(self, cache: SlotCache, *, interval: float = SLOT_SNAPSHOT_INTERVAL_S) -> None:
+        """Save the cache every `interval` seconds, and once more when cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self._save_logged(cache)
+        finally:
+            await asyncio.shield(self._save_logged(cache))
+
+    async def _save_logged(self, cache: SlotCache) -> None:
+        # the cache is read on the event loop, only the write runs in a thread
+        rows, dropped = self._rows(cache), self._take_dropped(cache)
+        try:
+            await asyncio.to_thread(self._write, rows, dropped)
+        except sqlite3.Error as e:
+            # the dropped days stay pending, they are deleted by the next save
+            logger.warning(f"⚠️  Could not save the availability snapshot: {e}")
+        else:
+            self._dropped -= dropped
+            logger.debug(f"💾 Saved {len(rows)} days of availability")
+
+    def _rows(self, cache: SlotCache) -> list[tuple[Hashable, str, int, bytes, float]]:
+        now = time.time()
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        until = today + datetime.timedelta(days=self._days)
+        return [
+            (key, day.isoformat(), slots.duration_min, slots.to_bytes(), now - age)
+            for key, day, slots, age in cache.snapshot(since=today)
+            if day < until and age < self._max_age
+        ]
+
+    def _take_dropped(self, cache: SlotCache) -> set[tuple[Hashable, datetime.date]]:
+        self._dropped |= cache.take_invalidated()
+        return set(self._dropped)
+
+    def _write(
+        self,
+        rows: list[tuple[Hashable, str, int, bytes, float]],
+        dropped: Iterable[tuple[Hashable, datetime.date]] = (),
+    ) -> None:
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # before the upsert, a day fetched again since its invalidation is written back
+            conn.executemany(
+                "DELETE FROM slot_snapshot WHERE cache_key = ? AND day = ?",
+                [(key, day.isoformat()) for key, day in dropped],
+            )
+            # keep the newest copy of a day when several workers write the same file
+            conn.executemany(
+                """
+                INSERT INTO slot_snapshot (cache_key, day, duration_min, starts, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (cache_key, day) DO UPDATE SET
+                    duration_min = excluded.duration_min,
+                    starts = excluded.starts,
+                    fetched_at = excluded.fetched_at
+                WHERE excluded.fetched_at > slot_snapshot.fetched_at
+                """,
+                rows,
+            )
+            conn.execute("DELETE FROM slot_snapshot WHERE day < ?", (today.isoformat(),))
+            conn.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from calendar_api import AvailableSlot, Calendar
+
+
+class SlotWindow:
+    """
+    Per-session view of a calendar's availability, minus the slots this session saw taken.
+
+    It holds no slots itself: every listing reads the calendar, whose slot cache only fetches
+    the days it doesn't hold yet, so widening a search (e.g. from two weeks to a month) only
+    fetches the missing tail and the session never sees availability older than the cache TTL.
+    """
+
+    def __init__(self, calendar: Calendar) -> None:
+        self._calendar = calendar
+        self._discarded: set[datetime.datetime] = set()
+
+    async def list(
+        self, *, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> list[AvailableSlot]:
+        """Return the slots with start_time <= slot.start_time < end_time."""
+        slots = await self._calendar.list_available_slots(start_time=start_time, end_time=end_time)
+        if not self._discarded:
+            return list(slots)
+        return [slot for slot in slots if slot.start_time not in self._discarded]
+
+    def invalidate(self) -> None:
+        """Forget the discarded slots, e.g. when the availability changed outside of this session."""
+        self._discarded.clear()
+
+    def discard(self, start_time: datetime.datetime) -> None:
+        """Hide a slot that has been booked or turned out to be taken."""
+        self._discarded.add(start_time)
@@ -1,56 +1,138 @@
+import asyncio
 import os
-from typing import Optional
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+
+from sms_outbox import SMS_OUTBOX_PATH, OutboxMessage, PermanentSendError, SMSOutbox
+
+# Twilio calls are blocking, they run on a small dedicated pool so they never stall the event loop
+SMS_SEND_TIMEOUT_S = 10.0
+SMS_MAX_WORKERS = 4
 
 class SMSManager:
-    def __init__(self):
+    def __init__(self, *, max_workers: int = SMS_MAX_WORKERS, outbox_path: str = SMS_OUTBOX_PATH):
         """Initialize the SMS manager with Twilio credentials from environment variables."""
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.from_phone_number = os.getenv("TWILIO_PHONE_NUMBER")
-        
+
         if not all([self.account_sid, self.auth_token, self.from_phone_number]):
             raise ValueError(
                 "Missing required Twilio environment variables. "
                 "Please set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_PHONE_NUMBER."
             )
-            
-        self.client = Client(self.account_sid, self.auth_token)
+
+        self.client = Client(
+            self.account_sid,
+            self.auth_token,
+            http_client=TwilioHttpClient(timeout=SMS_SEND_TIMEOUT_S),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sms")
+        self.outbox = SMSOutbox(outbox_path, send=self._send_outbox_message)
+        # jobs of this process using the outbox, the last one to end stops it
+        self._jobs = 0
 
     def send_confirmation_sms(self, to_phone_number: str, appointment_details: str, language: str = "de") -> bool:
         """
         Send a confirmation SMS to the specified phone number.
-        
+
+        This call blocks on the Twilio HTTP request, use `enqueue_confirmation_sms` from the
+        event loop.
+
         Args:
             to_phone_number: The recipient's phone number in E.164 format (e.g., +491746260679)
             appointment_details: The appointment details to include in the message
             language: The language for the SMS message (default: "de" for German)
-            
+
         Returns:
             bool: True if the message was sent successfully, False otherwise
         """
+        message_body = self._message_body(appointment_details, language)
+
+        try:
+            sid = self._create_message(to_phone_number, message_body)
+            print(f"SMS sent successfully. SID: {sid}")
+            return True
+        except TwilioRestException as e:
+            print(f"Error sending SMS: {e}")
+            return False
+        except Exception as e:
+            print(f"Unexpected error sending SMS: {e}")
+            return False
+
+    async def enqueue_confirmation_sms(
+        self,
+        to_phone_number: str,
+        appointment_details: str,
+        language: str = "de",
+        *,
+        booking_key: str,
+    ) -> bool:
+        """
+        Persist a confirmation SMS in the outbox, it is delivered (and retried) in the background.
+
+        Args:
+            booking_key: Identifies the booking, a booking only ever gets one confirmation
+
+        Returns:
+            bool: False if a confirmation was already enqueued for this booking
+        """
+        return await self.outbox.enqueue(
+            account_sid=self.account_sid,
+            to_phone_number=to_phone_number,
+            body=self._message_body(appointment_details, language),
+            dedup_key=booking_key,
+        )
+
+    def open_job(self) -> None:
+        """Start delivering for a job, e.g. the confirmations left in the outbox by earlier jobs."""
+        self._jobs += 1
+        self.outbox.start()
+
+    async def drain(self, booking_keys: Iterable[str] = (), *, timeout: float = SMS_SEND_TIMEOUT_S) -> None:
+        """
+        Wait for the confirmations of a job that is ending. The outbox keeps delivering for the
+        other jobs of the process and is only stopped once the last one ended.
+        """
+        await self.outbox.wait_sent(booking_keys, timeout=timeout)
+        self._jobs = max(0, self._jobs - 1)
+        if self._jobs == 0:
+            # whatever the outbox could not flush in time is picked up by the next process
+            await self.outbox.aclose(timeout=timeout)
+
+    def _message_body(self, appointment_details: str, language: str) -> str:
         # Message templates by language
         message_templates = {
             "de": f"Bestätigung des Termins: {appointment_details}",
             "fr": f"Confirmation de rendez-vous: {appointment_details}",
             "en": f"Appointment confirmation: {appointment_details}"
         }
-        
-        message_body = message_templates.get(language, message_templates["de"])
-        
+
+        return message_templates.get(language, message_templates["de"])
+
+    def _create_message(self, to_phone_number: str, message_body: str) -> str:
+        message = self.client.messages.create(
+            body=message_body,
+            from_=self.from_phone_number,
+            to=to_phone_number
+        )
+        return message.sid
+
+    async def _send_outbox_message(self, message: OutboxMessage) -> None:
+        loop = asyncio.get_running_loop()
+        send = partial(self._create_message, message.to_phone_number, message.body)
         try:
-            message = self.client.messages.create(
-                body=message_body,
-                from_=self.from_phone_number,
-                to=to_phone_number
-            )
-            print(f"SMS sent successfully. SID: {message.sid}")
-            return True
+            # not abandoned after a timeout: the message could still go out from its thread while
+            # the outbox retries it, the HTTP client's own SMS_SEND_TIMEOUT_S bounds the wait
+            sid = await loop.run_in_executor(self._executor, send)
         except TwilioRestException as e:
-            print(f"Error sending SMS: {e}")
-            return False
-        except Exception as e:
-            print(f"Unexpected error sending SMS: {e}")
-            return False
\ No newline at end of file
+            # 4xx (invalid number, unsubscribed recipient...) won't get better with retries
+            if 400 <= e.status < 500 and e.status != 429:
+                raise PermanentSendError(str(e)) from e
+            raise
+        print(f"SMS {message.id} sent successfully. SID: {sid}")
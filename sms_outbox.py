@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+SMS_OUTBOX_PATH = os.getenv("SMS_OUTBOX_PATH", "sms_outbox.sqlite3")
+# Twilio long codes accept about one message per second and per account
+SMS_RATE_PER_S = float(os.getenv("TWILIO_SMS_RATE_PER_S", "1"))
+
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BASE_BACKOFF_S = 2.0
+OUTBOX_MAX_BACKOFF_S = 300.0
+OUTBOX_POLL_INTERVAL_S = 5.0
+# a claimed message whose sender died is handed out again after this lease
+OUTBOX_CLAIM_LEASE_S = 60.0
+
+logger = logging.getLogger("sms-outbox")
+
+
+class PermanentSendError(Exception):
+    """The message can never be delivered (e.g. invalid number), it must not be retried."""
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    account_sid: str
+    to_phone_number: str
+    body: str
+    attempts: int
+
+
+SendFn = Callable[[OutboxMessage], Awaitable[None]]
+
+
+class _TokenBucket:
+    def __init__(self, *, rate: float, burst: float = 1.0) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class SMSOutbox:
+    """
+    Durable SQLite outbox for outbound SMS.
+
+    Messages are deduplicated by key (one confirmation per booking), claimed in batches by a
+    background worker, rate limited per Twilio account and retried with exponential backoff.
+    Several worker processes may share the same file; the rate limit is enforced per process.
+    """
+
+    def __init__(
+        self,
+        path: str = SMS_OUTBOX_PATH,
+        *,
+        send: SendFn,
+        rate_per_s: float = SMS_RATE_PER_S,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ) -> None:
+        self._path = path
+        self._send = send
+        self._rate_per_s = rate_per_s
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._busy = False
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sms_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dedup_key TEXT NOT NULL UNIQUE,
+                    account_sid TEXT NOT NULL,
+                    to_phone_number TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_until REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sms_outbox_due ON sms_outbox (status, next_attempt_at)"
+            )
+
+    async def enqueue(
+        self, *, account_sid: str, to_phone_number: str, body: str, dedup_key: str
+    ) -> bool:
+        """
+        Persist a message for delivery.
+
+        Returns:
+            bool: False if a message with the same dedup key was already enqueued
+        """
+        inserted = await asyncio.to_thread(
+            self._insert, account_sid, to_phone_number, body, dedup_key
+        )
+        if inserted:
+            self.start()
+            assert self._wakeup is not None
+            self._wakeup.set()
+        return inserted
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop, if not already running."""
+        if self._worker is not None and not self._worker.done():
+            return
+
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="sms_outbox_worker")
+
+    async def aclose(self, *, timeout: float = 10.0) -> None:
+        """Give the worker `timeout` seconds to flush due messages, the rest stays on disk."""
+        if self._worker is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and (
+            self._busy or await asyncio.to_thread(self._has_due_messages)
+        ):
+            await asyncio.sleep(0.1)
+
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    async def wait_sent(self, dedup_keys: Iterable[str], *, timeout: float = 10.0) -> bool:
+        """Wait up to `timeout` seconds for these messages to be sent (or dropped), False on timeout."""
+        keys = list(dedup_keys)
+        if not keys:
+            return True
+
+        deadline = time.monotonic() + timeout
+        while await asyncio.to_thread(self._has_unsent, keys):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        errors = 0
+        while True:
+            self._busy = True
+            try:
+                batch = await asyncio.to_thread(self._claim_batch)
+                results = await asyncio.gather(
+                    *(self._deliver(message) for message in batch), return_exceptions=True
+                )
+                for error in results:
+                    if isinstance(error, sqlite3.Error):
+                        # claimed rows are handed out again once their lease expires
+                        logger.error(f"💥 SMS outbox could not record a delivery: {error}")
+                    elif isinstance(error, BaseException):
+                        raise error
+                errors = 0
+            except sqlite3.Error as e:
+                # e.g. the file locked by another worker for longer than the connect timeout
+                backoff = min(OUTBOX_MAX_BACKOFF_S, OUTBOX_BASE_BACKOFF_S * 2**errors)
+                errors += 1
+                logger.error(f"💥 SMS outbox unavailable, retry in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                continue
+            finally:
+                self._busy = False
+
+            if not batch:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        bucket = self._buckets.get(message.account_sid)
+        if bucket is None:
+            bucket = self._buckets[message.account_sid] = _TokenBucket(rate=self._rate_per_s)
+        await bucket.acquire()
+
+        # the send runs to completion even if this worker is cancelled meanwhile: its outcome
+        # is recorded first, otherwise the message would be sent again once its lease expires
+        sending = asyncio.ensure_future(self._send(message))
+        try:
+            await asyncio.shield(sending)
+        except asyncio.CancelledError:
+            with contextlib.suppress(Exception):
+                await sending
+                await asyncio.to_thread(self._mark_sent, message.id)
+            raise
+        except PermanentSendError as e:
+            logger.error(f"SMS {message.id} to {message.to_phone_number} dropped: {e}")
+            await asyncio.to_thread(self._mark_failed, message.id, str(e))
+        except Exception as e:
+            attempts = message.attempts + 1
+            if attempts >= self._max_attempts:
+                logger.error(f"SMS {message.id} failed after {attempts} attempts: {e}")
+                await asyncio.to_thread(self._mark_failed, message.id, str(e))
+                return
+
+            backoff = min(OUTBOX_MAX_BACKOFF_S, OUTBOX_BASE_BACKOFF_S * 2**message.attempts)
+            backoff *= random.uniform(0.5, 1.5)
+            logger.warning(f"SMS {message.id} attempt {attempts} failed, retry in {backoff:.0f}s: {e}")
+            await asyncio.to_thread(self._schedule_retry, message.id, attempts, backoff, str(e))
+        else:
+            await asyncio.to_thread(self._mark_sent, message.id)
+
+    # --- storage, runs in worker threads ---
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _insert(self, account_sid: str, to_phone_number: str, body: str, dedup_key: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO sms_outbox
+                    (dedup_key, account_sid, to_phone_number, body, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (dedup_key, account_sid, to_phone_number, body, now, now),
+            )
+            return cursor.rowcount == 1
+
+    def _claim_batch(self) -> list[OutboxMessage]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """
+                SELECT id, account_sid, to_phone_number, body, attempts FROM sms_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND claimed_until < ?)
+                ORDER BY next_attempt_at LIMIT ?
+                """,
+                (now, now, self._batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE sms_outbox SET status = 'sending', claimed_until = ? WHERE id = ?",
+                [(now + OUTBOX_CLAIM_LEASE_S, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        return [OutboxMessage(*row) for row in rows]
+
+    def _has_due_messages(self) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT 1 FROM sms_outbox WHERE status = 'pending' AND next_attempt_at <= ? LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+        return row is not None
+
+    def _has_unsent(self, dedup_keys: list[str]) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT 1 FROM sms_outbox
+                WHERE status IN ('pending', 'sending') AND dedup_key IN ({','.join('?' * len(dedup_keys))})
+                LIMIT 1
+                """,
+                dedup_keys,
+            ).fetchone()
+        return row is not None
+
+    def _mark_sent(self, message_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sms_outbox SET status = 'sent', sent_at = ?, claimed_until = NULL WHERE id = ?",
+                (time.time(), message_id),
+            )
+
+    def _mark_failed(self, message_id: int, error: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE sms_outbox SET status = 'failed', last_error = ?, claimed_until = NULL
+                WHERE id = ?
+                """,
+                (error, message_id),
+            )
+
+    def _schedule_retry(self, message_id: int, attempts: int, backoff: float, error: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE sms_outbox
+                SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?,
+                    claimed_until = NULL
+                WHERE id = ?
+                """,
+                (attempts, time.time() + backoff, error, message_id),
+            )
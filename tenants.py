@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import time
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+# salons served by this deployment, keyed by the Twilio numbers they are reached on
+TENANTS_PATH = os.getenv("TENANTS_PATH", "tenants.json")
+# the file is checked for changes at most this often, edits apply without a restart
+TENANTS_RELOAD_S = float(os.getenv("TENANTS_RELOAD_S", "5"))
+
+logger = logging.getLogger("tenants")
+
+
+def normalize_number(number: str) -> str:
+    """Keep the leading + and the digits of a number, "+33 1 23-45" -> "+3312345"."""
+    return re.sub(r"[^\d+]", "", number)
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """
+    A salon and what its calls need: its calendar, timezone, language and prompt.
+
+    The cal.com API key itself never leaves the hosts: a tenant names the environment variable
+    holding it, so the tenant can travel in job metadata.
+    """
+
+    id: str
+    name: str = ""
+    timezone: str = "utc"
+    language: str = field(default_factory=lambda: os.getenv("FRONTDESK_LANGUAGE", "fr"))
+    cal_api_key_env: str = "CAL_API_KEY"
+    # same format as CALCOM_SERVICES, None books the front-desk event type only
+    services: Mapping[str, Any] | None = None
+    greeting: str | None = None
+    # appended to the agent's instructions, e.g. opening hours or prices
+    instructions: str = ""
+
+    @property
+    def cal_api_key(self) -> str | None:
+        return os.getenv(self.cal_api_key_env) or None
+
+    @classmethod
+    def from_env(cls) -> Tenant:
+        """The single salon of a deployment without a tenants file."""
+        try:
+            services = json.loads(os.environ["CALCOM_SERVICES"]) if os.getenv("CALCOM_SERVICES") else None
+        except ValueError as e:
+            logger.error(f"💥 Invalid CALCOM_SERVICES, booking the default event type only: {e}")
+            services = None
+        return cls(id="default", services=services)
+
+    @classmethod
+    def from_json(cls, data: Mapping[str, Any]) -> Tenant:
+        known = cls.__dataclass_fields__.keys()
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def to_json(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def tenant_from_metadata(metadata: str | None) -> Tenant:
+    """The tenant twilio_server put in the job metadata, or the deployment's default one."""
+    try:
+        data = json.loads(metadata) if metadata else {}
+        return Tenant.from_json(data["tenant"])
+    except (ValueError, TypeError, KeyError) as e:
+        if metadata:
+            logger.warning(f"⚠️  No tenant in job metadata, using the default one: {type(e).__name__}: {e}")
+        return Tenant.from_env()
+
+
+class TenantRegistry:
+    """
+    In-memory index of the tenants file by dialled number, reloaded when the file changes.
+
+    The file maps tenant ids to their config and the numbers they answer:
+
+        {"salon-anna": {"name": "Chez Anna", "numbers": ["+33 1 23 45 67 89"],
+                        "timezone": "Europe/Paris", "cal_api_key_env": "CAL_API_KEY_ANNA"}}
+
+    Without the file every number goes to `Tenant.from_env()`. A file that fails to parse is
+    logged and the previous index is kept.
+    """
+
+    def __init__(self, path: str = TENANTS_PATH, *, reload_interval: float = TENANTS_RELOAD_S) -> None:
+        self._path = path
+        self._reload_interval = reload_interval
+        self._by_number: dict[str, Tenant] = {}
+        self._mtime: float | None = None
+        self._checked_at = float("-inf")
+        self._default = Tenant.from_env()
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._by_number)
+
+    def get(self, number: str | None) -> Tenant | None:
+        """The tenant reached on `number`, None if the file doesn't list it."""
+        if time.monotonic() - self._checked_at >= self._reload_interval:
+            self.reload()
+        if self._mtime is None:
+            return self._default
+        return self._by_number.get(normalize_number(number or ""))
+
+    def reload(self) -> None:
+        """Re-read the file if its modification time changed."""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except FileNotFoundError:
+            self._by_number, self._mtime = {}, None
+            return
+        except OSError as e:
+            # e.g. a file being replaced, /voice must keep answering with the previous index
+            logger.error(f"💥 Can't stat tenants file {self._path}, keeping the previous one: {e}")
+            return
+        if mtime == self._mtime:
+            return
+
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                config = json.load(f)
+            by_number = {
+                normalize_number(number): Tenant.from_json({"id": tenant_id, **entry})
+                for tenant_id, entry in config.items()
+                for number in entry.get("numbers", ())
+            }
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"💥 Invalid tenants file {self._path}, keeping the previous one: {e}")
+            return
+
+        self._by_number, self._mtime = by_number, mtime
+        logger.info(f"🏢 {len(config)} tenants loaded on {len(by_number)} numbers")
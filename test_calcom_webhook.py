@@ -0,0 +1,32 @@
+import hashlib
+import hmac
+from datetime import date
+
+import pytest
+
+from calcom_webhook import affected_days, decode_invalidation, encode_invalidation, verify_signature
+
+
+def test_verify_signature() -> None:
+    body = b'{"triggerEvent": "BOOKING_CREATED"}'
+    signature = hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+
+    assert verify_signature(body, signature, "secret")
+    assert not verify_signature(body, signature, "other")
+    assert not verify_signature(body, None, "secret")
+
+
+def test_affected_days_cover_both_sides_of_a_reschedule() -> None:
+    payload = {
+        "startTime": "2030-01-08T23:45:00Z",
+        "endTime": "2030-01-09T00:15:00Z",
+        "rescheduleStartTime": "2030-01-03T10:00:00+01:00",
+        "rescheduleEndTime": "2030-01-03T10:30:00+01:00",
+    }
+
+    days = affected_days(payload)
+
+    assert days == [date(2030, 1, 3), date(2030, 1, 8), date(2030, 1, 9)]
+    assert decode_invalidation(encode_invalidation(42, days)) == (42, days)
+    with pytest.raises(ValueError):
+        decode_invalidation(b'{"days": []}')
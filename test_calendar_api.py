@@ -0,0 +1,632 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import calendar_api
+import calcom_http
+from calcom_http import CalComHTTPClient, CalComUnavailableError, CircuitOpenError
+from calendar_api import (
+    AvailableSlot,
+    Booking,
+    BookingNotFoundError,
+    CalComCalendar,
+    CalComIdentity,
+    CalendarUnavailableError,
+    EventType,
+    FakeCalendar,
+    SlotUnavailableError,
+    SlotBatch,
+    make_fake_calendars,
+)
+from booking_index import BookingIndex
+from calendar_registry import CalendarRegistry, ServiceCalendar, load_services_config
+from slot_cache import SlotCache
+from slot_registry import SlotRegistry
+from slot_snapshot import SlotSnapshot
+from slot_window import SlotWindow
+
+UTC = timezone.utc
+
+
+def _slots_between(start: datetime, end: datetime) -> list[AvailableSlot]:
+    # one slot every day at 10:00 UTC
+    slots = []
+    day = start.date()
+    while day <= end.date():
+        slot_start = datetime.combine(day, time(10, 0), tzinfo=UTC)
+        if start <= slot_start < end:
+            slots.append(AvailableSlot(start_time=slot_start, duration_min=30))
+        day += timedelta(days=1)
+    return slots
+
+
+class _CountingFetcher:
+    def __init__(self, *, delay: float = 0.0) -> None:
+        self.calls: list[tuple[datetime, datetime]] = []
+        self._delay = delay
+
+    async def __call__(self, start: datetime, end: datetime) -> SlotBatch:
+        self.calls.append((start, end))
+        await asyncio.sleep(self._delay)
+        return SlotBatch.from_slots(_slots_between(start, end), duration_min=30)
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_coalesces_concurrent_misses() -> None:
+    cache = SlotCache(ttl=60, chunk_days=31)
+    fetch = _CountingFetcher(delay=0.05)
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+    end = start + timedelta(days=14)
+
+    results = await asyncio.gather(
+        *(cache.get("evt", start_time=start, end_time=end, fetch=fetch) for _ in range(10))
+    )
+
+    assert len(fetch.calls) == 1
+    assert all(len(r) == 14 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_only_fetches_missing_days_and_invalidates() -> None:
+    cache = SlotCache(ttl=60, chunk_days=31)
+    fetch = _CountingFetcher()
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+
+    await cache.get("evt", start_time=start, end_time=start + timedelta(days=14), fetch=fetch)
+    await cache.get("evt", start_time=start, end_time=start + timedelta(days=30), fetch=fetch)
+    assert len(fetch.calls) == 2
+    assert fetch.calls[1][0] == start + timedelta(days=14)
+
+    cache.invalidate_day("evt", (start + timedelta(days=3)).date())
+    slots = await cache.get(
+        "evt", start_time=start, end_time=start + timedelta(days=30), fetch=fetch
+    )
+    assert len(fetch.calls) == 3
+    assert fetch.calls[2] == (start + timedelta(days=3), start + timedelta(days=4))
+    assert len(slots) == 30
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_stores_whole_days_after_a_narrow_miss() -> None:
+    cache = SlotCache(ttl=60)
+    day = datetime.now(UTC).date() + timedelta(days=1)
+    slots = [AvailableSlot(start_time=datetime.combine(day, time(h, 0), tzinfo=UTC), duration_min=30) for h in (9, 10, 14)]
+
+    async def fetch(start: datetime, end: datetime) -> SlotBatch:
+        return SlotBatch.from_slots([s for s in slots if start <= s.start_time < end], duration_min=30)
+
+    afternoon = datetime.combine(day, time(14, 0), tzinfo=UTC)
+    assert list(await cache.get("evt", start_time=afternoon, end_time=afternoon + timedelta(minutes=30), fetch=fetch)) == slots[2:]
+
+    whole_day = datetime.combine(day, time(0, 0), tzinfo=UTC)
+    assert list(await cache.get("evt", start_time=whole_day, end_time=whole_day + timedelta(days=1), fetch=fetch)) == slots
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_drops_past_and_old_days_when_storing() -> None:
+    cache = SlotCache(ttl=60, stale_max_age=3600)
+    today = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+    yesterday, tomorrow = (today - timedelta(days=1)).date(), (today + timedelta(days=1)).date()
+    cache.seed("evt", yesterday, SlotBatch(duration_min=30), age=0)
+    cache.seed("old", tomorrow, SlotBatch(duration_min=30), age=3600)
+    cache.invalidate_day("evt", yesterday)
+
+    await cache.get("evt", start_time=today, end_time=today + timedelta(days=1), fetch=_CountingFetcher())
+
+    assert cache.get_stale("old", start_time=today + timedelta(days=1), end_time=today + timedelta(days=2)) is None
+    assert ("evt", yesterday) not in cache._days and ("evt", yesterday) not in cache._generations
+    assert cache.get_stale("evt", start_time=today, end_time=today + timedelta(days=1)) is not None
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_fetches_long_windows_in_concurrent_chunks() -> None:
+    cache = SlotCache(ttl=60, chunk_days=7)
+    fetch = _CountingFetcher(delay=0.05)
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    slots = await cache.get("evt", start_time=start, end_time=start + timedelta(days=90), fetch=fetch)
+
+    assert len(fetch.calls) == 13
+    assert all(end - begin <= timedelta(days=7) for begin, end in fetch.calls)
+    assert loop.time() - started < 0.05 * 3
+    assert list(slots) == _slots_between(start, start + timedelta(days=90))
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_expires_entries() -> None:
+    cache = SlotCache(ttl=0)
+    fetch = _CountingFetcher()
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+
+    await cache.get("evt", start_time=start, end_time=start + timedelta(days=2), fetch=fetch)
+    await cache.get("evt", start_time=start, end_time=start + timedelta(days=2), fetch=fetch)
+    assert len(fetch.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_slot_snapshot_is_served_stale_while_revalidating(tmp_path) -> None:
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+    end = start + timedelta(days=3)
+    warm = SlotCache(ttl=60)
+    await warm.get("evt", start_time=start, end_time=end, fetch=_CountingFetcher())
+    assert SlotSnapshot(str(tmp_path / "snapshot.sqlite3")).save(warm) == 3
+
+    # a restarted worker: the snapshot answers right away, a background fetch refreshes it
+    cold = SlotCache(ttl=0)
+    assert SlotSnapshot(str(tmp_path / "snapshot.sqlite3")).load_into(cold) == 3
+    fetch = _CountingFetcher(delay=0.05)
+    slots = await cold.get("evt", start_time=start, end_time=end, fetch=fetch)
+    assert list(slots) == _slots_between(start, end)
+    assert fetch.calls == []
+
+    await asyncio.sleep(0.1)
+    assert len(fetch.calls) == 1
+    # refreshed days are regular entries again, an expired one is fetched before answering
+    await cold.get("evt", start_time=start, end_time=end, fetch=fetch)
+    assert len(fetch.calls) == 2
+    assert SlotSnapshot(str(tmp_path / "snapshot.sqlite3"), max_age=0).load_into(SlotCache()) == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_snapshot_deletes_days_invalidated_since_the_last_save(tmp_path) -> None:
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+    end = start + timedelta(days=3)
+    booked_day = (start + timedelta(days=1)).date()
+    cache = SlotCache(ttl=60)
+    fetch = _CountingFetcher()
+    await cache.get("evt", start_time=start, end_time=end, fetch=fetch)
+    snapshot = SlotSnapshot(str(tmp_path / "snapshot.sqlite3"))
+    assert snapshot.save(cache) == 3
+
+    # e.g. the agent booked a slot of that day, its saved availability is outdated
+    cache.invalidate_day("evt", booked_day)
+    assert snapshot.save(cache) == 2
+    restarted = SlotCache(ttl=60)
+    assert snapshot.load_into(restarted) == 2
+    assert ("evt", booked_day) not in restarted._days
+
+    # fetched again, the day is saved again
+    await cache.get("evt", start_time=start, end_time=end, fetch=fetch)
+    assert snapshot.save(cache) == 3
+    assert snapshot.load_into(SlotCache(ttl=60)) == 3
+
+
+@pytest.mark.asyncio
+async def test_slot_cache_stops_serving_a_snapshot_past_its_max_age() -> None:
+    start = datetime.combine(datetime.now(UTC).date(), time(0, 0), tzinfo=UTC)
+    snapshot_day = SlotBatch.from_slots(_slots_between(start, start + timedelta(days=1)), duration_min=30)
+
+    async def failing(start: datetime, end: datetime) -> SlotBatch:
+        raise CalendarUnavailableError("cal.com is down")
+
+    cache = SlotCache(ttl=60, stale_max_age=3600)
+    cache.seed("evt", start.date(), snapshot_day, age=120)
+    window = {"start_time": start, "end_time": start + timedelta(days=1)}
+    # expired but recent: served while the (failing) revalidation runs in the background
+    assert list(await cache.get("evt", **window, fetch=failing)) == list(snapshot_day)
+
+    cache = SlotCache(ttl=60, stale_max_age=3600)
+    cache.seed("evt", start.date(), snapshot_day, age=3600)
+    with pytest.raises(CalendarUnavailableError):
+        await cache.get("evt", **window, fetch=failing)
+
+
+@pytest.mark.asyncio
+async def test_fake_calendar_range_matches_linear_scan() -> None:
+    cal = FakeCalendar(timezone="Europe/Paris", days=365, seed=42)
+    all_slots = await cal.list_available_slots(
+        start_time=datetime.now(UTC), end_time=datetime.now(UTC) + timedelta(days=400)
+    )
+    assert all_slots == sorted(all_slots, key=lambda s: s.start_time)
+
+    start = datetime.now(UTC) + timedelta(days=10, hours=5)
+    end = start + timedelta(days=30)
+    expected = [s for s in all_slots if start <= s.start_time < end]
+    assert await cal.list_available_slots(start_time=start, end_time=end) == expected
+
+
+@pytest.mark.asyncio
+async def test_fake_calendar_booking_removes_slot() -> None:
+    [cal] = make_fake_calendars(1, timezone="UTC", days=30)
+    now = datetime.now(UTC)
+    slots = await cal.list_available_slots(start_time=now, end_time=now + timedelta(days=30))
+    booked = slots[len(slots) // 2]
+
+    await cal.schedule_appointment(
+        start_time=booked.start_time, attendee_email="a@b.c", user_name="Test"
+    )
+
+    remaining = await cal.list_available_slots(start_time=now, end_time=now + timedelta(days=30))
+    assert booked not in remaining
+    assert len(remaining) == len(slots) - 1
+
+
+def test_booking_index_finds_by_phone_name_and_time() -> None:
+    start = datetime(2030, 1, 7, 10, 0, tzinfo=UTC)
+    eloise = Booking("a", start, 30, "Éloïse Dupont", "e@x.fr", attendee_phone="+33 6 12 34 56 78")
+    later = Booking("b", start + timedelta(days=2), 30, "Eloise DUPONT", "e@x.fr")
+    other = Booking("c", start + timedelta(days=1), 30, "Marc Dupont", "m@x.fr", attendee_phone="0699999999")
+    index = BookingIndex([later, other, eloise])
+
+    assert index.find(phone="06 12 34 56 78") == [eloise]
+    assert index.find(name="eloise dupont") == [eloise, later]
+    assert index.find(name="dupont", start_time=start + timedelta(hours=1)) == [other, later]
+
+    index.put(Booking("a", start, 30, "Éloïse Martin", "e@x.fr"))
+    index.remove("c")
+    assert index.find(name="dupont") == [later]
+    assert index.find(phone="0612345678") == []
+    assert len(index) == 2
+
+
+@pytest.mark.asyncio
+async def test_fake_calendar_reschedules_and_cancels_bookings() -> None:
+    [cal] = make_fake_calendars(1, timezone="UTC", days=30)
+    now = datetime.now(UTC)
+    first, second = (await cal.list_available_slots(start_time=now, end_time=now + timedelta(days=30)))[:2]
+    await cal.schedule_appointment(
+        start_time=first.start_time, attendee_email="a@b.c", user_name="Anna Test", attendee_phone="+33612345678"
+    )
+
+    [booking] = await cal.find_bookings(phone="06 12 34 56 78")
+    moved = await cal.reschedule_appointment(booking_uid=booking.uid, start_time=second.start_time)
+    assert moved.start_time == second.start_time
+    assert await cal.find_bookings(name="anna") == [moved]
+    with pytest.raises(SlotUnavailableError):
+        await cal.reschedule_appointment(booking_uid=booking.uid, start_time=second.start_time)
+
+    await cal.cancel_appointment(booking_uid=booking.uid)
+    assert await cal.find_bookings(name="anna") == []
+    free = await cal.list_available_slots(start_time=now, end_time=now + timedelta(days=30))
+    assert first in free and second in free
+    with pytest.raises(BookingNotFoundError):
+        await cal.cancel_appointment(booking_uid=booking.uid)
+
+
+def test_available_slot_is_hashable_and_id_is_stable() -> None:
+    start = datetime(2030, 1, 7, 9, 30, tzinfo=UTC)
+    a = AvailableSlot(start_time=start, duration_min=30)
+    b = AvailableSlot(start_time=start, duration_min=30)
+
+    assert a == b and hash(a) == hash(b)
+    assert a.unique_hash == b.unique_hash
+    assert a.unique_hash.startswith("ST_")
+
+
+def test_slot_batch_range_and_split_by_day() -> None:
+    start = datetime(2030, 1, 1, tzinfo=UTC)
+    slots = _slots_between(start, start + timedelta(days=10))
+    batch = SlotBatch.from_slots(slots, duration_min=30)
+
+    assert list(batch) == slots
+    assert [s.unique_hash for s in batch] == [s.unique_hash for s in slots]
+
+    window = batch.range(start + timedelta(days=2, hours=10), start + timedelta(days=5, hours=10))
+    assert list(window) == slots[2:5]
+
+    by_day = batch.split_by_day()
+    assert len(by_day) == 10
+    assert list(by_day[(start + timedelta(days=3)).date()]) == [slots[3]]
+
+    # materialised once, slices and days reuse the same slots (and ids)
+    assert window[0] is batch[2]
+    assert by_day[(start + timedelta(days=3)).date()][0] is batch[3]
+    assert SlotBatch.concat(by_day.values(), duration_min=30)[4] is batch[4]
+
+
+def test_slot_registry_is_bounded_and_forgets_booked_slots() -> None:
+    start = datetime(2030, 1, 1, tzinfo=UTC)
+    slots = _slots_between(start, start + timedelta(days=5))
+    registry = SlotRegistry(max_size=3, ttl=60)
+
+    for slot in slots:
+        registry.add(slot)
+
+    assert len(registry) == 3
+    assert registry.get(slots[0].unique_hash) is None  # evicted
+    assert registry.is_fresh(slots[4].unique_hash)
+    assert registry.find_by_start(slots[3].start_time) == slots[3]
+
+    registry.discard(slots[3].start_time)
+    assert registry.get(slots[3].unique_hash) is None
+    assert not SlotRegistry(ttl=0).is_fresh(slots[4].unique_hash)
+
+
+class _CountingCalendar:
+    def __init__(self) -> None:
+        self.calls: list[tuple[datetime, datetime]] = []
+
+    async def list_available_slots(self, *, start_time: datetime, end_time: datetime) -> list[AvailableSlot]:
+        self.calls.append((start_time, end_time))
+        return _slots_between(start_time, end_time)
+
+
+@pytest.mark.asyncio
+async def test_slot_window_reads_the_calendar_and_hides_discarded_slots() -> None:
+    cal = _CountingCalendar()
+    window = SlotWindow(cal)
+    now = datetime(2030, 1, 1, 8, 0, tzinfo=UTC)
+
+    month = await window.list(start_time=now, end_time=now + timedelta(days=30))
+    assert month == _slots_between(now, now + timedelta(days=30))
+
+    window.discard(month[0].start_time)
+    again = await window.list(start_time=now, end_time=now + timedelta(days=14))
+    assert again == _slots_between(now, now + timedelta(days=14))[1:]
+    # nothing is kept in the window, each listing goes through the calendar and its slot cache
+    assert cal.calls == [(now, now + timedelta(days=30)), (now, now + timedelta(days=14))]
+
+    window.invalidate()
+    assert month[0] in await window.list(start_time=now, end_time=now + timedelta(days=1))
+
+
+async def _calcom_stub(monkeypatch, handler) -> TestServer:
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(calendar_api, "BASE_URL", str(server.make_url("/")))
+    monkeypatch.setattr(calcom_http, "CALCOM_RETRY_BASE_DELAY_S", 0.001)
+    return server
+
+
+@pytest.mark.asyncio
+async def test_calcom_client_retries_reads_then_opens_the_circuit(monkeypatch) -> None:
+    calls = 0
+
+    async def handler(request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        return web.Response(status=503)
+
+    server = await _calcom_stub(monkeypatch, handler)
+    client = CalComHTTPClient()
+    try:
+        with pytest.raises(CalComUnavailableError):
+            async with client.request("GET", str(server.make_url("/slots")), endpoint="slots"):
+                pass
+        assert calls == 1 + calcom_http.CALCOM_READ_RETRIES
+
+        with pytest.raises(CalComUnavailableError):
+            async with client.request("GET", str(server.make_url("/slots")), endpoint="slots"):
+                pass
+        assert client.breaker.is_open
+
+        calls_before = calls
+        with pytest.raises(CircuitOpenError):
+            async with client.request("GET", str(server.make_url("/slots")), endpoint="slots"):
+                pass
+        assert calls == calls_before
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_calcom_client_lets_a_new_trial_through_after_a_cancelled_one(monkeypatch) -> None:
+    slow = True
+
+    async def handler(request: web.Request) -> web.Response:
+        if slow:
+            await asyncio.sleep(10)
+        return web.json_response({})
+
+    server = await _calcom_stub(monkeypatch, handler)
+    client = CalComHTTPClient()
+    client.breaker = calcom_http.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client.breaker.record_failure()
+    url = str(server.make_url("/me"))
+
+    async def get() -> int:
+        async with client.request("GET", url, endpoint="me") as resp:
+            return resp.status
+
+    try:
+        trial = asyncio.create_task(get())
+        await asyncio.sleep(0.1)
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+
+        slow = False
+        assert await get() == 200
+        assert not client.breaker.is_open
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+def test_shared_calcom_client_stays_open_until_its_loop_shuts_down() -> None:
+    async def job() -> CalComHTTPClient:
+        client = calcom_http.shared_calcom_client()
+        client.session  # opens the pool
+        return client
+
+    async def worker() -> CalComHTTPClient:
+        first, second = await job(), await job()
+        assert first is second and first._session is not None
+        return first
+
+    client = asyncio.run(worker())
+    assert client._session is None
+
+
+@pytest.mark.asyncio
+async def test_calcom_calendar_serves_stale_slots_when_degraded(monkeypatch) -> None:
+    healthy = True
+    day = datetime.now(UTC).date() + timedelta(days=1)
+
+    async def handler(request: web.Request) -> web.Response:
+        if not healthy:
+            return web.Response(status=502)
+        start = f"{day.isoformat()}T10:00:00.000Z"
+        return web.json_response({"status": "success", "data": {day.isoformat(): [{"start": start}]}})
+
+    server = await _calcom_stub(monkeypatch, handler)
+    client = CalComHTTPClient()
+    cal = CalComCalendar(
+        api_key="test",
+        timezone="UTC",
+        slot_cache=SlotCache(ttl=0),
+        identity=CalComIdentity(username="salon", event_type_id=1),
+        http_client=client,
+    )
+    window = {
+        "start_time": datetime.combine(day, time(0, 0), tzinfo=UTC),
+        "end_time": datetime.combine(day + timedelta(days=1), time(0, 0), tzinfo=UTC),
+    }
+    try:
+        assert len(await cal.list_available_slots(**window)) == 1
+
+        healthy = False
+        assert len(await cal.list_available_slots(**window)) == 1  # stale, but not "no slots"
+
+        with pytest.raises(CalendarUnavailableError):
+            await cal.list_available_slots(
+                start_time=window["end_time"], end_time=window["end_time"] + timedelta(days=1)
+            )
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_calcom_calendar_does_not_fall_back_to_a_snapshot_past_its_max_age(monkeypatch) -> None:
+    day = datetime.now(UTC).date() + timedelta(days=1)
+    start = datetime.combine(day, time(0, 0), tzinfo=UTC)
+    snapshot_day = SlotBatch.from_slots(_slots_between(start, start + timedelta(days=1)), duration_min=30)
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(status=502)
+
+    server = await _calcom_stub(monkeypatch, handler)
+    client = CalComHTTPClient()
+    cache = SlotCache(ttl=0, stale_max_age=3600)
+    cal = CalComCalendar(
+        api_key="test",
+        timezone="UTC",
+        slot_cache=cache,
+        identity=CalComIdentity(username="salon", event_type_id=1),
+        http_client=client,
+    )
+    window = {"start_time": start, "end_time": start + timedelta(days=1)}
+    try:
+        cache.seed(1, day, snapshot_day, age=120)
+        assert list(await cal.list_available_slots(**window)) == list(snapshot_day)
+
+        cache.stale_max_age = 60  # the snapshot day is now too old to be trusted
+        with pytest.raises(CalendarUnavailableError):
+            await cal.list_available_slots(**window)
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_calcom_calendar_refreshes_bookings_incrementally(monkeypatch) -> None:
+    start = datetime.now(UTC).replace(microsecond=0) + timedelta(days=2)
+    queries = []
+
+    def booking(uid: str, status: str = "accepted") -> dict:
+        return {
+            "uid": uid,
+            "start": start.isoformat(),
+            "end": (start + timedelta(minutes=30)).isoformat(),
+            "status": status,
+            "eventTypeId": 1,
+            "updatedAt": "2030-01-01T00:00:00Z",
+            "attendees": [{"name": "Anna Test", "email": "a@b.c", "phoneNumber": "+33612345678"}],
+        }
+
+    async def handler(request: web.Request) -> web.Response:
+        queries.append(dict(request.query))
+        if "afterUpdatedAt" in request.query:
+            return web.json_response({"status": "success", "data": [booking("a", "cancelled"), booking("b")]})
+        return web.json_response({"status": "success", "data": [booking("a")]})
+
+    server = await _calcom_stub(monkeypatch, handler)
+    monkeypatch.setattr(calendar_api, "BOOKING_INDEX_REFRESH_S", 0)
+    client = CalComHTTPClient()
+    cal = CalComCalendar(
+        api_key="test",
+        timezone="UTC",
+        identity=CalComIdentity(username="refresh-test", event_type_id=1),
+        http_client=client,
+    )
+    try:
+        assert [b.uid for b in await cal.find_bookings(phone="0612345678")] == ["a"]
+        assert queries[0]["status"] == "upcoming"
+
+        assert [b.uid for b in await cal.find_bookings(name="anna test")] == ["b"]
+        assert queries[1]["afterUpdatedAt"].startswith("2030-01-01")
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_calcom_calendar_reports_an_unknown_booking_with_a_non_json_404(monkeypatch) -> None:
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(status=404, text="<html>Not Found</html>", content_type="text/html")
+
+    server = await _calcom_stub(monkeypatch, handler)
+    client = CalComHTTPClient()
+    cal = CalComCalendar(
+        api_key="test",
+        timezone="UTC",
+        identity=CalComIdentity(username="not-found-test", event_type_id=1),
+        http_client=client,
+    )
+    try:
+        with pytest.raises(BookingNotFoundError):
+            await cal.cancel_appointment(booking_uid="gone")
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_service_calendar_merges_staff_and_books_whoever_is_free() -> None:
+    start = datetime(2030, 1, 8, 9, 0, tzinfo=UTC)
+    shared, anna_only = start, start + timedelta(hours=1)
+    anna = FakeCalendar(timezone="UTC", slots=[AvailableSlot(start_time=t, duration_min=30) for t in (shared, anna_only)])
+    marc = FakeCalendar(timezone="UTC", slots=[AvailableSlot(start_time=shared, duration_min=30)])
+    coupe = ServiceCalendar("Coupe", {"Anna": anna, "Marc": marc}, duration_min=30)
+
+    slots = await coupe.list_available_slots(start_time=start, end_time=start + timedelta(days=1))
+    assert [slot.start_time for slot in slots] == [shared, anna_only]
+
+    for _ in range(2):
+        await coupe.schedule_appointment(start_time=shared, attendee_email="a@b.c", user_name="A")
+    assert not await anna.list_available_slots(start_time=shared, end_time=anna_only)
+    assert not await marc.list_available_slots(start_time=shared, end_time=anna_only)
+    with pytest.raises(SlotUnavailableError):
+        await coupe.schedule_appointment(start_time=shared, attendee_email="a@b.c", user_name="A")
+
+    assert coupe.for_staff("Marc").staff == ["Marc"]
+
+
+def test_calendar_registry_routes_services_to_event_types() -> None:
+    event_types = (
+        EventType(id=1, slug="coupe-anna", title="Coupe", duration_min=30),
+        EventType(id=2, slug="coupe-marc", title="Coupe", duration_min=45),
+        EventType(id=3, slug="couleur", title="Couleur", duration_min=90),
+    )
+    identity = CalComIdentity(username="salon", event_type_id=1, event_types=event_types)
+    cal = CalComCalendar(api_key="key", timezone="UTC", slot_cache=SlotCache(), identity=identity)
+    config = load_services_config(
+        '{"Coupe": {"Anna": "coupe-anna", "Marc": "coupe-marc"}, "Couleur": "couleur", "Brushing": "missing"}'
+    )
+
+    registry = CalendarRegistry.from_calcom(cal, config)
+
+    assert registry.services == ["Coupe", "Couleur"]
+    assert registry.describe() == ["Coupe (45 min): Anna, Marc", "Couleur (90 min)"]
+    assert registry.calendar("Coupe", "Marc").key == "cal.com:2"
+    assert registry.calendar("Couleur").key == "cal.com:3"
+    with pytest.raises(KeyError):
+        registry.calendar("Coupe", "Zoe")
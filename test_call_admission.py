@@ -0,0 +1,19 @@
+from call_admission import CallAdmission
+
+
+def test_admission_counts_calls_admitted_since_the_last_count() -> None:
+    admission = CallAdmission(capacity=3)
+    admission.update(busy_rooms=1)
+
+    assert admission.admit() and admission.admit()
+    assert not admission.admit()  # the burst filled the last free agents before the next count
+
+    admission.update(busy_rooms=2)
+    assert admission.admit()
+    assert not admission.admit()
+
+
+def test_admission_without_capacity_admits_every_call() -> None:
+    admission = CallAdmission(capacity=0)
+
+    assert all(admission.admit() for _ in range(100))
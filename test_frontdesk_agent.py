@@ -0,0 +1,82 @@
+import datetime
+import os
+import tempfile
+
+import pytest
+
+# the module creates its SMS manager on import
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC_test")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "test")
+os.environ.setdefault("TWILIO_PHONE_NUMBER", "+15550000000")
+os.environ.setdefault("SMS_OUTBOX_PATH", os.path.join(tempfile.gettempdir(), "test_sms_outbox.sqlite3"))
+
+from calendar_api import AvailableSlot, FakeCalendar, SlotBatch  # noqa: E402
+from frontdesk_agent import DEFAULT_RANGE_DAYS, FrontDeskAgent  # noqa: E402
+from slot_cache import SlotCache  # noqa: E402
+
+TIMEZONE = "UTC"
+
+
+class _CachedFakeCalendar(FakeCalendar):
+    """A fake calendar listing through a slot cache like CalComCalendar, counting its fetches."""
+
+    def __init__(self, *, cache: SlotCache, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.fetches: list[tuple[datetime.datetime, datetime.datetime]] = []
+
+    async def list_available_slots(
+        self, *, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> list[AvailableSlot]:
+        return list(
+            await self.cache.get("fake", start_time=start_time, end_time=end_time, fetch=self._fetch)
+        )
+
+    async def _fetch(self, start_time: datetime.datetime, end_time: datetime.datetime) -> SlotBatch:
+        self.fetches.append((start_time, end_time))
+        slots = await super().list_available_slots(start_time=start_time, end_time=end_time)
+        return SlotBatch.from_slots(slots, duration_min=30)
+
+
+def _agent(calendar: FakeCalendar) -> FrontDeskAgent:
+    agent = FrontDeskAgent(timezone=TIMEZONE)
+    agent._calendar = calendar
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_on_enter_prefetches_the_default_range_once() -> None:
+    calendar = _CachedFakeCalendar(cache=SlotCache(ttl=60), timezone=TIMEZONE, seed=1)
+    agent = _agent(calendar)
+
+    await agent.on_enter()
+    prefetch = agent._prefetch
+    await agent.on_enter()
+    assert agent._prefetch is prefetch
+    await prefetch
+
+    assert calendar.fetches
+    first, last = calendar.fetches[0][0], max(end for _, end in calendar.fetches)
+    assert last - first >= datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+
+    # the first listing of the call is served by the prefetched days
+    fetches = len(calendar.fetches)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    await agent.window.list(start_time=now, end_time=now + datetime.timedelta(days=DEFAULT_RANGE_DAYS))
+    assert len(calendar.fetches) == fetches
+
+
+@pytest.mark.asyncio
+async def test_on_enter_skips_the_fetch_while_the_cache_is_fresh() -> None:
+    cache = SlotCache(ttl=60)
+    calendar = _CachedFakeCalendar(cache=cache, timezone=TIMEZONE, seed=1)
+
+    first_call = _agent(calendar)
+    await first_call.on_enter()
+    await first_call._prefetch
+    fetches = len(calendar.fetches)
+
+    next_call = _agent(calendar)
+    await next_call.on_enter()
+    await next_call._prefetch
+    assert len(calendar.fetches) == fetches
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import room_pool
+from room_pool import RoomPool
+
+
+class _FakeRoomService:
+    def __init__(self) -> None:
+        self.created: list[str] = []
+        self.deleted: list[str] = []
+        self.fail = False
+
+    async def create_room(self, req):
+        if self.fail:
+            raise ConnectionError("livekit down")
+        self.created.append(req.name)
+
+    async def delete_room(self, req):
+        self.deleted.append(req.room)
+
+
+class _FakeLiveKitAPI:
+    def __init__(self) -> None:
+        self.room = _FakeRoomService()
+
+
+async def _settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_room_pool_hands_out_rooms_and_refills() -> None:
+    api = _FakeLiveKitAPI()
+    pool = RoomPool(api, size=2, empty_timeout=600)
+    assert pool.pop() is None  # not filled yet, the caller creates its own room
+
+    pool.start()
+    await _settle()
+    assert len(pool) == 2
+
+    first = pool.pop()
+    assert first == api.room.created[0]
+    await _settle()
+    assert len(pool) == 2 and len(api.room.created) == 3
+
+    await pool.aclose()
+    assert sorted(api.room.deleted) == sorted(api.room.created[1:])
+
+
+@pytest.mark.asyncio
+async def test_room_pool_replaces_rooms_about_to_expire(monkeypatch) -> None:
+    monkeypatch.setattr(room_pool, "ROOM_POOL_EXPIRY_MARGIN_S", 59.7)
+    api = _FakeLiveKitAPI()
+    pool = RoomPool(api, size=1, empty_timeout=60)
+    pool.start()
+    await _settle()
+    expiring = api.room.created[0]
+
+    await asyncio.sleep(0.4)
+    room = pool.pop()
+    assert room is not None and room != expiring
+
+    api.room.fail = True
+    await asyncio.sleep(0.4)
+    assert pool.pop() is None
+
+    await pool.aclose()
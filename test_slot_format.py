@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from calendar_api import AvailableSlot
+from slot_format import SlotFormatter
+
+UTC = timezone.utc
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def test_summarize_by_day_groups_per_part_of_day() -> None:
+    now = datetime(2030, 1, 7, 7, 0, tzinfo=PARIS)
+    # 08:00 to 19:30 local, every half hour, on two days
+    slots = [
+        AvailableSlot(start_time=(now + timedelta(days=day, hours=1, minutes=30 * i)).astimezone(UTC), duration_min=30)
+        for day in (1, 2)
+        for i in range(24)
+    ]
+
+    lines, shown = SlotFormatter(tz=PARIS, now=now).summarize_by_day(slots, representatives=2)
+
+    assert lines[0].startswith("Tuesday, January 08, 2030 (tomorrow): morning 8 (")
+    assert "afternoon 10 (" in lines[0] and "evening 6 (" in lines[0]
+    assert len(lines) == 2
+    assert len(shown) == 2 * 3 * 2
+    assert f"{slots[0].unique_hash} 08:00" in lines[0]
+
+    fr_lines, _ = SlotFormatter(tz=PARIS, now=now, language="fr").summarize_by_day(slots)
+    assert fr_lines[1].startswith("mercredi 9 janvier 2030 (dans 2 jours): matin 8 (")
+
+
+def test_slot_line_is_localised() -> None:
+    now = datetime(2030, 1, 7, 7, 0, tzinfo=PARIS)
+    slot = AvailableSlot(start_time=datetime(2030, 1, 7, 6, 30, tzinfo=UTC), duration_min=30)
+    later = AvailableSlot(start_time=datetime(2030, 1, 22, 9, 0, tzinfo=UTC), duration_min=30)
+
+    assert SlotFormatter(tz=PARIS, now=now).slot_line(slot) == (
+        f"{slot.unique_hash} – Monday, January 07, 2030 at 07:30 CET (in less than an hour)"
+    )
+    assert SlotFormatter(tz=PARIS, now=now, language="de").slot_line(later) == (
+        f"{later.unique_hash} – Dienstag, 22. Januar 2030 um 10:00 CET (in 2 Wochen)"
+    )
+    assert SlotFormatter(tz=PARIS, now=now, language="fr").appointment(later.start_time) == (
+        "mardi 22 janvier 2030 à 10:00 CET"
+    )
+
+
+def test_slot_line_handles_dst_switch_days() -> None:
+    now = datetime(2030, 3, 30, 12, 0, tzinfo=PARIS)
+    before = AvailableSlot(start_time=datetime(2030, 3, 31, 0, 30, tzinfo=UTC), duration_min=30)
+    after = AvailableSlot(start_time=datetime(2030, 3, 31, 8, 0, tzinfo=UTC), duration_min=30)
+    formatter = SlotFormatter(tz=PARIS, now=now)
+
+    assert formatter.slot_line(before).endswith("at 01:30 CET (tomorrow)")
+    assert formatter.slot_line(after).endswith("at 10:00 CEST (tomorrow)")
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from slot_holds import SlotHolds, _memory_holds
+
+UTC = timezone.utc
+START = datetime(2030, 1, 8, 9, 0, tzinfo=UTC)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def holds_path(request, tmp_path):
+    return None if request.param == "memory" else str(tmp_path / "holds.sqlite3")
+
+
+@pytest.mark.asyncio
+async def test_a_held_slot_is_hidden_from_other_callers_until_released(holds_path) -> None:
+    alice = SlotHolds("alice", path=holds_path, ttl=60)
+    bob = SlotHolds("bob", path=holds_path, ttl=60)
+
+    assert await alice.hold("cal", START)
+    assert await alice.hold("cal", START)  # extending our own hold
+    assert not await bob.hold("cal", START)
+    assert await bob.held_by_others("cal", START, START + timedelta(days=1)) == {START}
+    assert await alice.held_by_others("cal", START, START + timedelta(days=1)) == set()
+    assert await bob.held_by_others("other-cal", START, START + timedelta(days=1)) == set()
+
+    await alice.release_all()
+    assert await bob.hold("cal", START)
+
+
+@pytest.mark.asyncio
+async def test_expired_holds_can_be_taken_over(holds_path) -> None:
+    alice = SlotHolds("alice", path=holds_path, ttl=0)
+    bob = SlotHolds("bob", path=holds_path, ttl=60)
+
+    assert await alice.hold("expiring-cal", START)
+    assert await bob.held_by_others("expiring-cal", START, START + timedelta(hours=1)) == set()
+    assert await bob.hold("expiring-cal", START)
+    assert not await alice.hold("expiring-cal", START)
+
+
+@pytest.mark.asyncio
+async def test_a_slot_of_several_staff_is_hidden_once_all_of_them_are_held(holds_path) -> None:
+    anyone = SlotHolds("anyone", path=holds_path, ttl=60)
+    anna = SlotHolds("anna", path=holds_path, ttl=60)
+    marc = SlotHolds("marc", path=holds_path, ttl=60)
+    staff = ["cal.com:1", "cal.com:2"]
+
+    assert await anna.hold(["cal.com:1"], START)
+    assert await anyone.held_by_others(staff, START, START + timedelta(hours=1)) == set()
+    assert await anyone.hold(staff, START)  # Marc is still free
+    assert await anyone.hold(staff, START)  # extending it doesn't take anyone else
+    assert not await marc.hold(["cal.com:2"], START)
+    assert await marc.held_by_others(staff, START, START + timedelta(hours=1)) == {START}
+
+    await anyone.release(staff, START)
+    assert await marc.hold(["cal.com:2"], START)
+
+
+@pytest.mark.asyncio
+async def test_expired_memory_holds_are_pruned() -> None:
+    alice = SlotHolds("alice", path=None, ttl=0)
+    bob = SlotHolds("bob", path=None, ttl=60)
+    await alice.hold("pruned-cal", START)
+    await bob.hold("pruned-cal", START + timedelta(hours=1))
+
+    assert ("pruned-cal", int(START.timestamp())) not in _memory_holds
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import sms_outbox
+from sms_outbox import OutboxMessage, PermanentSendError, SMSOutbox
+
+
+class _FlakySender:
+    def __init__(self, *, failures: int = 0, permanent: bool = False) -> None:
+        self.sent: list[OutboxMessage] = []
+        self._failures = failures
+        self._permanent = permanent
+
+    async def __call__(self, message: OutboxMessage) -> None:
+        if self._permanent:
+            raise PermanentSendError("invalid number")
+        if self._failures:
+            self._failures -= 1
+            raise RuntimeError("twilio is down")
+        self.sent.append(message)
+
+
+def _statuses(path) -> list[str]:
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT status FROM sms_outbox ORDER BY id")]
+
+
+@pytest.mark.asyncio
+async def test_outbox_deduplicates_by_booking(tmp_path) -> None:
+    sender = _FlakySender()
+    outbox = SMSOutbox(str(tmp_path / "outbox.sqlite3"), send=sender, rate_per_s=100)
+
+    assert await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="a", dedup_key="b1")
+    assert not await outbox.enqueue(
+        account_sid="AC1", to_phone_number="+4917", body="a", dedup_key="b1"
+    )
+    await outbox.aclose(timeout=2)
+
+    assert [m.body for m in sender.sent] == ["a"]
+    assert _statuses(tmp_path / "outbox.sqlite3") == ["sent"]
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_with_backoff(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(sms_outbox, "OUTBOX_BASE_BACKOFF_S", 0.01)
+    sender = _FlakySender(failures=2)
+    outbox = SMSOutbox(str(tmp_path / "outbox.sqlite3"), send=sender, rate_per_s=100)
+
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="a", dedup_key="b1")
+    for _ in range(50):
+        if sender.sent:
+            break
+        outbox._wakeup.set()
+        await asyncio.sleep(0.05)
+    await outbox.aclose(timeout=2)
+
+    assert len(sender.sent) == 1
+    assert sender.sent[0].attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_outbox_drops_permanent_failures(tmp_path) -> None:
+    outbox = SMSOutbox(
+        str(tmp_path / "outbox.sqlite3"), send=_FlakySender(permanent=True), rate_per_s=100
+    )
+
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+00", body="a", dedup_key="b1")
+    await outbox.aclose(timeout=2)
+
+    assert _statuses(tmp_path / "outbox.sqlite3") == ["failed"]
+
+
+
+@pytest.mark.asyncio
+async def test_outbox_waits_for_the_given_messages_only(tmp_path) -> None:
+    async def send(message: OutboxMessage) -> None:
+        if message.body == "stuck":
+            raise RuntimeError("twilio is down")
+
+    outbox = SMSOutbox(str(tmp_path / "outbox.sqlite3"), send=send, rate_per_s=100)
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="stuck", dedup_key="other-call")
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="ok", dedup_key="this-call")
+
+    assert await outbox.wait_sent(["this-call"], timeout=2)
+    assert not await outbox.wait_sent(["other-call"], timeout=0.2)
+    await outbox.aclose(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_outbox_survives_storage_errors(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(sms_outbox, "OUTBOX_BASE_BACKOFF_S", 0.01)
+    sender = _FlakySender()
+    outbox = SMSOutbox(str(tmp_path / "outbox.sqlite3"), send=sender, rate_per_s=100)
+    claim_batch = outbox._claim_batch
+    calls = 0
+
+    def locked_once() -> list[OutboxMessage]:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim_batch()
+
+    monkeypatch.setattr(outbox, "_claim_batch", locked_once)
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="a", dedup_key="b1")
+
+    assert await outbox.wait_sent(["b1"], timeout=2)
+    assert [m.body for m in sender.sent] == ["a"]
+    await outbox.aclose(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_outbox_records_a_send_finishing_after_the_worker_stopped(tmp_path) -> None:
+    started = asyncio.Event()
+
+    async def slow_send(message: OutboxMessage) -> None:
+        started.set()
+        await asyncio.sleep(0.2)
+
+    outbox = SMSOutbox(str(tmp_path / "outbox.sqlite3"), send=slow_send, rate_per_s=100)
+    await outbox.enqueue(account_sid="AC1", to_phone_number="+4917", body="a", dedup_key="b1")
+    await started.wait()
+    await outbox.aclose(timeout=0)
+
+    # not left 'sending' until its lease expires, which would send it a second time
+    assert _statuses(tmp_path / "outbox.sqlite3") == ["sent"]
@@ -0,0 +1,39 @@
+import json
+import os
+
+from tenants import Tenant, TenantRegistry, tenant_from_metadata
+
+
+def _write(path, config, mtime: float) -> None:
+    path.write_text(json.dumps(config))
+    os.utime(path, (mtime, mtime))
+
+
+def test_registry_routes_numbers_and_reloads_changes(tmp_path) -> None:
+    path = tmp_path / "tenants.json"
+    _write(path, {"anna": {"name": "Chez Anna", "numbers": ["+33 1 23 45 67 89"], "timezone": "Europe/Paris"}}, 1)
+    tenants = TenantRegistry(str(path), reload_interval=0)
+
+    anna = tenants.get("+33123456789")
+    assert anna is not None and (anna.id, anna.timezone) == ("anna", "Europe/Paris")
+    assert tenants.get("+33999999999") is None
+
+    _write(path, {"marc": {"numbers": ["+33123456789"], "language": "de"}}, 2)
+    assert tenants.get("+33123456789").id == "marc"
+
+    path.write_text("{not json")
+    os.utime(path, (3, 3))
+    assert tenants.get("+33123456789").id == "marc"  # a broken edit keeps the previous index
+
+
+def test_registry_without_file_serves_the_default_tenant(tmp_path) -> None:
+    tenants = TenantRegistry(str(tmp_path / "missing.json"))
+
+    assert tenants.get("+33123456789") == Tenant.from_env()
+
+
+def test_tenant_travels_in_job_metadata() -> None:
+    tenant = Tenant(id="anna", name="Chez Anna", timezone="Europe/Paris", services={"Coupe": "coupe"})
+
+    assert tenant_from_metadata(json.dumps({"call_sid": "CA1", "tenant": tenant.to_json()})) == tenant
+    assert tenant_from_metadata("") == Tenant.from_env()
@@ -0,0 +1,31 @@
+import asyncio
+
+import jwt
+from livekit.api import AccessToken, VideoGrants
+
+from token_minter import TokenMinter, benchmark
+
+SECRET = "secret-" + "x" * 32
+
+
+def test_minted_token_has_the_claims_of_access_token() -> None:
+    minter = TokenMinter("key", SECRET)
+
+    token = minter.mint(identity="twilio-caller-CA1", room="room-1")
+    expected = (
+        AccessToken("key", SECRET)
+        .with_identity("twilio-caller-CA1")
+        .with_name("Twilio Caller")
+        .with_grants(VideoGrants(room_join=True, room="room-1"))
+        .to_jwt()
+    )
+
+    assert jwt.get_unverified_header(token) == jwt.get_unverified_header(expected)
+    assert jwt.decode(token, SECRET, algorithms=["HS256"]) == jwt.decode(expected, SECRET, algorithms=["HS256"])
+    assert minter.latency.count == 1
+
+
+def test_benchmark_mints_every_token() -> None:
+    histogram = asyncio.run(benchmark(TokenMinter("key", SECRET), tokens=500, concurrency=50))
+
+    assert histogram.count == 500
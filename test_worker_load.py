@@ -0,0 +1,29 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import worker_load
+from worker_load import WorkerLoad
+
+
+@pytest.mark.asyncio
+async def test_worker_load_runs_from_an_executor_thread_and_sees_loop_lag(monkeypatch) -> None:
+    monkeypatch.setattr(worker_load, "LOAD_SAMPLE_INTERVAL_S", 0.02)
+    loop = asyncio.get_running_loop()
+    # what LiveKit passes: the AgentServer, whose load_fnc runs in the loop's executor
+    worker = SimpleNamespace(active_jobs=[object()], _loop=loop)
+    load = WorkerLoad(max_jobs=4)
+
+    assert 0.0 <= await loop.run_in_executor(None, load, worker) <= 1.0
+
+    time.sleep(0.3)  # a blocked worker loop
+    await asyncio.sleep(0.05)
+    assert await loop.run_in_executor(None, load, worker) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_worker_load_is_full_at_max_jobs() -> None:
+    worker = SimpleNamespace(active_jobs=[object(), object()])
+    assert await asyncio.get_running_loop().run_in_executor(None, WorkerLoad(max_jobs=2), worker) == 1.0
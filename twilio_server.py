@@ -1,9 +1,41 @@
+import asyncio
+import contextlib
+import json
 import os
+import time
 import uuid
+import aiohttp
 from dotenv import load_dotenv
 from quart import Quart, request, Response
 from twilio.twiml.voice_response import VoiceResponse, Connect
-from livekit.api import LiveKitAPI, CreateRoomRequest, AccessToken, VideoGrants
+from livekit.api import (
+    LiveKitAPI,
+    CreateRoomRequest,
+    ListRoomsRequest,
+    SendDataRequest,
+    CreateAgentDispatchRequest,
+)
+from livekit.protocol.models import DataPacket
+
+from call_admission import (
+    CALL_HOLD_MAX_TRIES,
+    CALL_HOLD_S,
+    CALL_OCCUPANCY_REFRESH_S,
+    CALL_OVERFLOW_NUMBER,
+    CallAdmission,
+)
+from calcom_webhook import (
+    BOOKING_TRIGGERS,
+    CALCOM_INVALIDATE_TOPIC,
+    affected_days,
+    encode_invalidation,
+    verify_signature,
+)
+from latency import LatencyHistogram
+from room_pool import ROOM_POOL_EMPTY_TIMEOUT_S, RoomPool
+from tenants import TenantRegistry
+from token_minter import TokenMinter
+from slot_snapshot import SLOT_SNAPSHOT_PATH, SlotSnapshot
 
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
@@ -19,48 +51,284 @@ livekit_url = os.environ.get("LIVEKIT_URL")
 if not all([livekit_api_key, livekit_api_secret, livekit_url]):
     raise EnvironmentError("LIVEKIT_API_KEY, LIVEKIT_API_SECRET, et LIVEKIT_URL doivent être définis")
 
-# Le client LiveKit sera initialisé dans les routes asynchrones
+# Les jetons des appelants sont signés sans reconstruire un AccessToken à chaque appel
+token_minter = TokenMinter(livekit_api_key, livekit_api_secret)
+
+# Les salons servis par ce déploiement, retrouvés par le numéro Twilio appelé (To)
+tenants = TenantRegistry()
+
+# Messages lus à l'appelant par Twilio, dans la langue du salon appelé (fr, de ou en) ; un
+# numéro sans salon utilise la langue par défaut du déploiement
+CALL_LANGUAGE = os.environ.get("FRONTDESK_LANGUAGE", "fr")
+TWIML_MESSAGES = {
+    "fr": {
+        "voice": "fr-FR",
+        "hold": "Merci de patienter un instant, nous prenons votre appel.",
+        "busy": "Toutes nos lignes sont occupées. Merci de rappeler dans quelques minutes.",
+        "unassigned": "Désolé, ce numéro n'est pas attribué.",
+        "error": "Désolé, une erreur technique est survenue. Veuillez réessayer plus tard.",
+    },
+    "de": {
+        "voice": "de-DE",
+        "hold": "Bitte haben Sie einen Moment Geduld, wir nehmen Ihren Anruf gleich entgegen.",
+        "busy": "Alle unsere Leitungen sind besetzt. Bitte rufen Sie in einigen Minuten erneut an.",
+        "unassigned": "Diese Nummer ist leider nicht vergeben.",
+        "error": "Leider ist ein technischer Fehler aufgetreten. Bitte versuchen Sie es später erneut.",
+    },
+    "en": {
+        "voice": "en-US",
+        "hold": "Please hold on a moment, we are taking your call.",
+        "busy": "All our lines are busy. Please call back in a few minutes.",
+        "unassigned": "Sorry, this number is not assigned.",
+        "error": "Sorry, a technical error occurred. Please try again later.",
+    },
+}
+
+# Secret des webhooks Cal.com, utilisé pour vérifier leur signature ; sans lui le webhook est refusé
+calcom_webhook_secret = os.environ.get("CALCOM_WEBHOOK_SECRET")
+
+# Un seul client LiveKit pour toute la durée de vie du serveur : les connexions HTTP (et leur
+# handshake TLS) sont réutilisées d'un appel à l'autre au lieu d'être rouvertes à chaque sonnerie
+LIVEKIT_CONN_LIMIT = 32
+LIVEKIT_KEEPALIVE_S = 60.0
+LIVEKIT_TIMEOUT_S = 5.0
+
+# nom sous lequel le worker frontdesk_agent s'enregistre, il ne rejoint que les chambres où il est dispatché
+FRONTDESK_AGENT_NAME = os.environ.get("FRONTDESK_AGENT_NAME", "frontdesk_agent")
+# au-delà, l'appel patiente et réessaie plutôt que d'ouvrir une chambre où aucun agent ne viendra
+AGENT_DISPATCH_TIMEOUT_S = float(os.environ.get("AGENT_DISPATCH_TIMEOUT_S", "2"))
+
+lkapi: LiveKitAPI | None = None
+livekit_session: aiohttp.ClientSession | None = None
+room_pool: RoomPool | None = None
+# quand tous les agents sont occupés, l'appel patiente au lieu de dégrader les appels en cours
+admission = CallAdmission()
+occupancy_task: asyncio.Task | None = None
+# latence des appels à l'API LiveKit, par méthode
+livekit_latency: dict[str, LatencyHistogram] = {}
+
+
+@app.before_serving
+async def start_livekit_client():
+    global lkapi, livekit_session
+    livekit_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=LIVEKIT_CONN_LIMIT, keepalive_timeout=LIVEKIT_KEEPALIVE_S),
+        timeout=aiohttp.ClientTimeout(total=LIVEKIT_TIMEOUT_S),
+    )
+    # lit LIVEKIT_URL, LIVEKIT_API_KEY et LIVEKIT_API_SECRET depuis l'environnement
+    lkapi = LiveKitAPI(session=livekit_session)
+
+    # des chambres vides créées d'avance : le webhook /voice n'attend plus create_room
+    global room_pool
+    room_pool = RoomPool(lkapi)
+    room_pool.start()
+
+    global occupancy_task
+    if admission.capacity > 0:
+        occupancy_task = asyncio.create_task(count_busy_rooms())
+
+
+async def count_busy_rooms():
+    """Recompte régulièrement les chambres occupées par un appel."""
+    while True:
+        try:
+            with livekit_timer("list_rooms"):
+                rooms = await lkapi.room.list_rooms(ListRoomsRequest())
+            admission.update(sum(1 for room in rooms.rooms if room.num_participants))
+        except Exception as e:
+            print(f"Erreur lors du comptage des chambres occupées: {e}")
+        await asyncio.sleep(CALL_OCCUPANCY_REFRESH_S)
+
+
+@app.after_serving
+async def stop_livekit_client():
+    for method, histogram in livekit_latency.items():
+        print(f"Latence LiveKit {method}: {histogram.summary()}")
+    print(f"Génération des jetons: {token_minter.latency.summary()}")
+    if occupancy_task is not None:
+        occupancy_task.cancel()
+    if room_pool is not None:
+        await room_pool.aclose()
+    if lkapi is not None:
+        await lkapi.aclose()
+    if livekit_session is not None:
+        # une session fournie à LiveKitAPI n'est pas fermée par lui
+        await livekit_session.close()
+
+
+@contextlib.contextmanager
+def livekit_timer(method: str):
+    """Mesure la durée d'un appel à l'API LiveKit et la consigne dans son histogramme."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        livekit_latency.setdefault(method, LatencyHistogram()).observe(elapsed)
+        print(f"LiveKit {method}: {elapsed * 1000:.0f}ms")
+
+
+async def dispatch_agent(room_name: str, metadata: str):
+    """Envoie l'agent dans la chambre, en AGENT_DISPATCH_TIMEOUT_S au plus."""
+    with livekit_timer("create_dispatch"):
+        await asyncio.wait_for(
+            lkapi.agent_dispatch.create_dispatch(
+                CreateAgentDispatchRequest(agent_name=FRONTDESK_AGENT_NAME, room=room_name, metadata=metadata)
+            ),
+            AGENT_DISPATCH_TIMEOUT_S,
+        )
+
+
+def say(response: VoiceResponse, message: str, language: str) -> VoiceResponse:
+    """Ajoute à la réponse un des TWIML_MESSAGES, dans la langue donnée (anglais par défaut)."""
+    messages = TWIML_MESSAGES.get(language, TWIML_MESSAGES["en"])
+    response.say(messages[message], language=messages["voice"])
+    return response
+
+
+def hold_response(attempt: int, language: str) -> VoiceResponse:
+    """
+    Fait patienter l'appelant puis rappelle /voice, ou le renvoie vers le numéro de débordement
+    (ou raccroche) s'il a déjà attendu CALL_HOLD_MAX_TRIES fois.
+    """
+    response = VoiceResponse()
+    if attempt < CALL_HOLD_MAX_TRIES:
+        if attempt == 0:
+            say(response, "hold", language)
+        response.pause(length=CALL_HOLD_S)
+        response.redirect(f"/voice?attempt={attempt + 1}", method="POST")
+    elif CALL_OVERFLOW_NUMBER:
+        response.dial(CALL_OVERFLOW_NUMBER)
+    else:
+        say(response, "busy", language)
+    return response
+
 
 @app.route("/voice", methods=["POST"])
 async def voice():
-    # Créer un nom de chambre unique pour chaque appel
-    room_name = str(uuid.uuid4())
-    
+    # Avec Quart, le formulaire se lit de façon asynchrone
+    form = await request.form
+
     # Créer une identité pour le participant (l'appelant Twilio)
-    participant_identity = f"twilio-caller-{request.form.get('CallSid')}"
+    participant_identity = f"twilio-caller-{form.get('CallSid')}"
+
+    # Le salon joint : l'agent reçoit sa configuration dans les métadonnées du job
+    tenant = tenants.get(form.get("To"))
+    if tenant is None:
+        print(f"Appel vers un numéro sans salon configuré: {form.get('To')}")
+        return Response(str(say(VoiceResponse(), "unassigned", CALL_LANGUAGE)), mimetype="text/xml")
 
     try:
-        # Créer une instance de LiveKitAPI (lit automatiquement les variables d'environnement)
-        async with LiveKitAPI() as lkapi:
-            # 1. Créer la chambre sur LiveKit
-            await lkapi.room.create_room(CreateRoomRequest(name=room_name))
-
-            # 2. Créer un jeton d'accès pour que Twilio puisse rejoindre cette chambre
-            token = (
-                AccessToken(livekit_api_key, livekit_api_secret)
-                .with_identity(participant_identity)
-                .with_name("Twilio Caller")
-                .with_grants(VideoGrants(room_join=True, room=room_name))
-                .to_jwt()
-            )
+        attempt = max(0, int(request.args.get("attempt", 0)))
+    except ValueError:
+        # paramètre altéré (ex. "?attempt=abc") : on repart du premier essai plutôt qu'une erreur 500
+        attempt = 0
 
-            # 3. Construire la réponse TwiML pour connecter l'appel à la chambre LiveKit
-            response = VoiceResponse()
-            connect = Connect()
-            # L'URL du stream doit contenir le jeton d'accès
-            connect.stream(url=f"{livekit_url.replace('http', 'ws')}", access_token=token)
-            response.append(connect)
+    # Tous les agents sont occupés : faire patienter l'appelant
+    if not admission.admit():
+        print(f"Capacité atteinte ({admission.busy}/{admission.capacity}), appel en attente (essai {attempt})")
+        return Response(str(hold_response(attempt, tenant.language)), mimetype="text/xml")
 
-            print(f"Appel entrant. Chambre créée: {room_name}, Jeton généré pour: {participant_identity}")
+    try:
+        # 1. Prendre une chambre prête dans le pool, ou la créer si le pool est vide
+        room_name = room_pool.pop() if room_pool is not None else None
+        if room_name is None:
+            room_name = str(uuid.uuid4())
+            with livekit_timer("create_room"):
+                await lkapi.room.create_room(
+                    CreateRoomRequest(name=room_name, empty_timeout=ROOM_POOL_EMPTY_TIMEOUT_S)
+                )
 
-            return Response(str(response), mimetype="text/xml")
+        # l'agent est dispatché pendant que le jeton est généré
+        metadata = json.dumps(
+            {
+                "call_sid": form.get("CallSid"),
+                "from": form.get("From"),
+                "to": form.get("To"),
+                "tenant": tenant.to_json(),
+            }
+        )
+        dispatch = asyncio.create_task(dispatch_agent(room_name, metadata))
 
-    except Exception as e:
-        print(f"Erreur lors de la création de la chambre ou du jeton: {e}")
+        # 2. Créer un jeton d'accès pour que Twilio puisse rejoindre cette chambre
+        token = token_minter.mint(identity=participant_identity, room=room_name)
+
+        # sans agent dans la chambre, l'appelant n'entendrait que du silence : il patiente et
+        # l'appel est retenté, la chambre inutilisée se ferme d'elle-même (empty_timeout)
+        try:
+            await dispatch
+        except Exception as e:
+            print(f"Erreur lors du dispatch de l'agent dans {room_name} (essai {attempt}): {type(e).__name__}: {e}")
+            return Response(str(hold_response(attempt, tenant.language)), mimetype="text/xml")
+
+        # 3. Construire la réponse TwiML pour connecter l'appel à la chambre LiveKit
         response = VoiceResponse()
-        response.say("Désolé, une erreur technique est survenue. Veuillez réessayer plus tard.", language="fr-FR")
+        connect = Connect()
+        # L'URL du stream doit contenir le jeton d'accès
+        connect.stream(url=f"{livekit_url.replace('http', 'ws')}", access_token=token)
+        response.append(connect)
+
+        print(f"Appel entrant pour {tenant.name or tenant.id}. Chambre: {room_name}, Jeton généré pour: {participant_identity}")
+
         return Response(str(response), mimetype="text/xml")
 
+    except Exception as e:
+        print(f"Erreur lors de la création de la chambre ou du jeton: {e}")
+        return Response(str(say(VoiceResponse(), "error", tenant.language)), mimetype="text/xml")
+
+@app.route("/calcom/webhook", methods=["POST"])
+async def calcom_webhook():
+    # Webhooks de réservation Cal.com (créée, annulée, déplacée) : les agents en cours
+    # d'exécution oublient les jours concernés dans leur cache de disponibilités
+    # sans secret, n'importe qui pourrait vider les caches des agents : le webhook est refusé
+    if not calcom_webhook_secret:
+        return Response("CALCOM_WEBHOOK_SECRET is not set", status=503)
+    body = await request.get_data()
+    if not verify_signature(body, request.headers.get("X-Cal-Signature-256"), calcom_webhook_secret):
+        return Response("invalid signature", status=401)
+
+    event = await request.get_json(force=True, silent=True) or {}
+    payload = event.get("payload") or {}
+    if event.get("triggerEvent") not in BOOKING_TRIGGERS or "eventTypeId" not in payload:
+        return Response(status=204)
+
+    try:
+        event_type_id = int(payload["eventTypeId"])
+        days = affected_days(payload)
+    except (TypeError, ValueError) as e:
+        return Response(f"invalid payload: {e}", status=400)
+
+    # le snapshot des disponibilités ne doit pas recharger ces jours au prochain démarrage
+    if os.path.exists(SLOT_SNAPSHOT_PATH):
+        await asyncio.to_thread(SlotSnapshot().drop_days, event_type_id, days)
+
+    try:
+        with livekit_timer("list_rooms"):
+            rooms = await lkapi.room.list_rooms(ListRoomsRequest())
+        data = encode_invalidation(event_type_id, days)
+        with livekit_timer("send_data"):
+            await asyncio.gather(
+                *(
+                    lkapi.room.send_data(
+                        SendDataRequest(
+                            room=room.name,
+                            data=data,
+                            kind=DataPacket.Kind.RELIABLE,
+                            topic=CALCOM_INVALIDATE_TOPIC,
+                        )
+                    )
+                    for room in rooms.rooms
+                    if room.num_participants  # les chambres vides du pool n'ont pas d'agent
+                ),
+                return_exceptions=True,
+            )
+    except Exception as e:
+        print(f"Erreur lors de la diffusion de l'invalidation Cal.com: {e}")
+        return Response(status=502)
+
+    print(f"Webhook Cal.com {event['triggerEvent']}: jours invalidés {[d.isoformat() for d in days]} dans {len(rooms.rooms)} chambres")
+    return Response(status=204)
+
 @app.route("/sms", methods=["POST"])
 def sms():
     print("SMS reçu :", request.form)
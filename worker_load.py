@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from livekit.agents import utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+# calls a worker takes at once, each one runs its own VAD and turn detector
+FRONTDESK_MAX_JOBS = int(os.getenv("FRONTDESK_MAX_JOBS", str(max(1, int(get_cpu_monitor().cpu_count())))))
+# above this load LiveKit stops dispatching calls to the worker
+FRONTDESK_LOAD_THRESHOLD = float(os.getenv("FRONTDESK_LOAD_THRESHOLD", "0.75"))
+# a worker event loop this late is reported as fully loaded
+EVENT_LOOP_LAG_BUDGET_S = 0.1
+LOAD_SAMPLE_INTERVAL_S = 0.5
+
+logger = logging.getLogger("worker-load")
+
+
+class WorkerLoad:
+    """
+    `WorkerOptions.load_fnc` of the front desk: the highest of the CPU usage, the event loop
+    lag of the worker and whether it already runs `max_jobs` calls.
+
+    CPU and lag are averaged over a few samples, a single busy moment doesn't turn calls away.
+    A worker at `max_jobs` reports a load of 1, above any threshold.
+
+    LiveKit calls it from an executor thread, so both are sampled from a thread of its own: the
+    lag is the time the worker loop takes to run a callback scheduled with call_soon_threadsafe.
+    """
+
+    def __init__(self, *, max_jobs: int = FRONTDESK_MAX_JOBS) -> None:
+        self.max_jobs = max_jobs
+        self._cpu = utils.MovingAverage(5)
+        self._lag = utils.MovingAverage(5)
+        self._lock = threading.Lock()
+        self._cpu_monitor = get_cpu_monitor()
+        self._sampler: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # perf_counter() of the lag probe scheduled on the loop and not run yet
+        self._probe_sent: float | None = None
+        self._last_logged = 0.0
+
+    def __call__(self, worker) -> float:
+        # AgentServer._loop is private, not public API: only read defensively, when it is absent
+        # (e.g. renamed in another livekit-agents release) only CPU and jobs are measured
+        self._start(getattr(worker, "_loop", None))
+        with self._lock:
+            cpu, lag = self._cpu.get_avg(), self._lag.get_avg()
+        jobs = len(worker.active_jobs)
+        load = max(cpu, min(lag / EVENT_LOOP_LAG_BUDGET_S, 1.0), 1.0 if jobs >= self.max_jobs else 0.0)
+
+        if load >= FRONTDESK_LOAD_THRESHOLD and time.monotonic() - self._last_logged > 10:
+            self._last_logged = time.monotonic()
+            logger.warning(
+                f"🚦 Worker full, not taking calls: cpu={cpu:.0%} loop lag={lag * 1000:.0f}ms "
+                f"jobs={jobs}/{self.max_jobs}"
+            )
+        return load
+
+    def _start(self, loop: asyncio.AbstractEventLoop | None) -> None:
+        # started lazily, on the first load check
+        with self._lock:
+            if self._sampler is not None:
+                return
+            self._loop = loop
+            self._sampler = threading.Thread(target=self._sample, daemon=True, name="frontdesk_load")
+            self._sampler.start()
+
+    def _sample(self) -> None:
+        while True:
+            self._probe_lag()
+            cpu = self._cpu_monitor.cpu_percent(interval=LOAD_SAMPLE_INTERVAL_S)
+            with self._lock:
+                self._cpu.add_sample(cpu)
+
+    def _probe_lag(self) -> None:
+        if self._loop is None:
+            return
+        if (sent := self._probe_sent) is not None:
+            # the previous probe hasn't run yet, the loop has been blocked at least this long
+            with self._lock:
+                self._lag.add_sample(time.perf_counter() - sent)
+            return
+
+        self._probe_sent = sent = time.perf_counter()
+        try:
+            self._loop.call_soon_threadsafe(self._probe_ran, sent)
+        except RuntimeError:  # the loop is closed, the worker is shutting down
+            self._loop = None
+
+    def _probe_ran(self, sent: float) -> None:
+        with self._lock:
+            self._lag.add_sample(time.perf_counter() - sent)
+        self._probe_sent = None